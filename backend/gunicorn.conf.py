@@ -0,0 +1,18 @@
+"""
+Gunicorn config for the production servers.
+
+ASGI (async views, live updates):
+    gunicorn backend.asgi:application -c backend/gunicorn.conf.py
+
+WSGI:
+    GUNICORN_WORKER_CLASS=sync gunicorn backend.wsgi:application -c backend/gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 from decouple import config
 import os
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'taskmanagerapp.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +98,40 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://redis:6379/1'),
+    }
+}
+
+TASK_LIST_CACHE_TIMEOUT = config('TASK_LIST_CACHE_TIMEOUT', default=300, cast=int)
+
+# Live task events (server-sent events fanned out through Redis pub/sub)
+TASK_EVENTS_ENABLED = config('TASK_EVENTS_ENABLED', default=True, cast=bool)
+TASK_EVENTS_REDIS_URL = config('TASK_EVENTS_REDIS_URL', default='redis://redis:6379/2')
+TASK_EVENTS_KEEPALIVE = config('TASK_EVENTS_KEEPALIVE', default=15, cast=int)
+TASK_EVENTS_QUEUE_SIZE = config('TASK_EVENTS_QUEUE_SIZE', default=100, cast=int)
+TASK_EVENTS_RECONNECT_DELAY = config('TASK_EVENTS_RECONNECT_DELAY', default=1, cast=int)
+
+# Request metrics per URL name, scraped from /metrics/ in the Prometheus
+# format by superusers or with 'Authorization: Bearer <METRICS_TOKEN>'
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Every process shares its totals through the cache this often
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=10, cast=int)
+# Totals of processes that stopped flushing are dropped after this long
+METRICS_PROCESS_TIMEOUT = config('METRICS_PROCESS_TIMEOUT', default=86400, cast=int)
+# Requests at least this slow are logged with their slowest queries
+METRICS_SLOW_REQUEST_SECONDS = config('METRICS_SLOW_REQUEST_SECONDS', default=1.0, cast=float)
+
+# Task search (PostgreSQL text search configuration)
+TASK_SEARCH_CONFIG = config('TASK_SEARCH_CONFIG', default='english')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -149,6 +185,99 @@ CELERY_IMPORTS = (
     'taskmanagerapp.tasks',
 )
 
+# Every notification type has its own queue, so a backlog of bulk "created"
+# mails or a slow SMTP drain never delays deadline warnings. Unrouted tasks
+# go to the default 'celery' queue.
+NOTIFICATION_QUEUES = {
+    'taskmanagerapp.tasks.send_task_email_to_assignee_created': 'created-notifications',
+    'taskmanagerapp.tasks.send_bulk_task_notifications': 'created-notifications',
+    'taskmanagerapp.tasks.send_task_email_to_assignee_updated': 'update-notifications',
+    'taskmanagerapp.tasks.notify_superusers_of_task_updated': 'update-notifications',
+    'taskmanagerapp.tasks.send_coalesced_update_notifications': 'update-notifications',
+    'taskmanagerapp.tasks.send_deadline_warnings': 'deadline-warnings',
+    'taskmanagerapp.tasks.warn_users_one_day_before_deadline': 'deadline-warnings',
+    'taskmanagerapp.tasks.send_queued_emails': 'mail',
+}
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_ROUTES = {
+    task: {'queue': queue} for task, queue in NOTIFICATION_QUEUES.items()
+}
+
+# Per-queue rate limits (Celery rate limit strings such as '100/m', applied to
+# every task of the queue per worker), e.g. CELERY_MAIL_RATE_LIMIT=6/m
+NOTIFICATION_QUEUE_RATE_LIMITS = {
+    queue: config(f"CELERY_{queue.upper().replace('-', '_')}_RATE_LIMIT", default='')
+    for queue in set(NOTIFICATION_QUEUES.values())
+}
+CELERY_TASK_ANNOTATIONS = {
+    task: {'rate_limit': NOTIFICATION_QUEUE_RATE_LIMITS[queue]}
+    for task, queue in NOTIFICATION_QUEUES.items() if NOTIFICATION_QUEUE_RATE_LIMITS[queue]
+}
+
+# Notification tasks are long I/O-bound jobs: acknowledge them after they ran,
+# so a lost worker's task is redelivered, and prefetch one message at a time,
+# so a busy worker does not hold messages an idle one could run
+CELERY_TASK_ACKS_LATE = config('CELERY_TASK_ACKS_LATE', default=True, cast=bool)
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # Unacknowledged messages are redelivered after this many seconds
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT', default=3600, cast=int),
+}
+
+# Jobs are written to the outbox table with the change they are about and
+# published by the relay process (manage.py relay_outbox)
+OUTBOX_RELAY_BATCH_SIZE = config('OUTBOX_RELAY_BATCH_SIZE', default=500, cast=int)
+OUTBOX_RELAY_INTERVAL = config('OUTBOX_RELAY_INTERVAL', default=1.0, cast=float)
+# Published messages and processed job ids are kept this long to drop
+# duplicates; longer than a relay or worker takes to redeliver
+OUTBOX_RETENTION = timedelta(hours=config('OUTBOX_RETENTION_HOURS', default=24, cast=int))
+
+# Deadline warnings are sent by a periodic job instead of one ETA message per task
+DEADLINE_WARNING_WINDOW = timedelta(hours=config('DEADLINE_WARNING_WINDOW_HOURS', default=24, cast=int))
+DEADLINE_WARNING_BATCH_SIZE = config('DEADLINE_WARNING_BATCH_SIZE', default=500, cast=int)
+
+# Done tasks untouched for this long are moved to the archive table in
+# batches. On PostgreSQL a batch gives up after the lock timeout instead of
+# waiting behind writes, and the next run picks it up.
+TASK_ARCHIVE_AFTER = timedelta(days=config('TASK_ARCHIVE_AFTER_DAYS', default=90, cast=int))
+TASK_ARCHIVE_BATCH_SIZE = config('TASK_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+TASK_ARCHIVE_LOCK_TIMEOUT_MS = config('TASK_ARCHIVE_LOCK_TIMEOUT_MS', default=2000, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'send-deadline-warnings': {
+        'task': 'taskmanagerapp.tasks.send_deadline_warnings',
+        'schedule': config('DEADLINE_WARNING_INTERVAL', default=60, cast=int),
+    },
+    'send-queued-emails': {
+        'task': 'taskmanagerapp.tasks.send_queued_emails',
+        'schedule': config('EMAIL_QUEUE_INTERVAL', default=10, cast=int),
+    },
+    'refresh-task-deadline-stats': {
+        'task': 'taskmanagerapp.tasks.refresh_task_deadline_stats',
+        'schedule': config('TASK_DEADLINE_STATS_INTERVAL', default=60, cast=int),
+    },
+    'reconcile-task-stats': {
+        'task': 'taskmanagerapp.tasks.reconcile_task_stats',
+        'schedule': config('TASK_STATS_RECONCILE_INTERVAL', default=3600, cast=int),
+    },
+    'purge-outbox': {
+        'task': 'taskmanagerapp.tasks.purge_outbox',
+        'schedule': config('OUTBOX_PURGE_INTERVAL', default=3600, cast=int),
+    },
+    'archive-done-tasks': {
+        'task': 'taskmanagerapp.tasks.archive_done_tasks',
+        'schedule': config('TASK_ARCHIVE_INTERVAL', default=3600, cast=int),
+    },
+}
+
+# Superuser recipients are cached until a User or subscription changes; the
+# timeout only bounds staleness after queryset updates that skip signals
+NOTIFICATION_RECIPIENTS_CACHE_TIMEOUT = config('NOTIFICATION_RECIPIENTS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Update notifications for a task are coalesced over this many seconds
+TASK_UPDATE_NOTIFICATION_WINDOW = config('TASK_UPDATE_NOTIFICATION_WINDOW', default=60, cast=int)
+
 # Celery email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 
@@ -162,13 +291,23 @@ EMAIL_HOST_USER = 'violalaurastumpf@gmail.com'
 EMAIL_HOST_PASSWORD = 'ijuf frhh zxmo auwp'
 DEFAULT_FROM_EMAIL = 'Celery <violalaurastumpf@gmail.com>'
 
+# Notification mails are queued and sent in chunks over shared SMTP connections
+EMAIL_QUEUE_BATCH_SIZE = config('EMAIL_QUEUE_BATCH_SIZE', default=100, cast=int)
+EMAIL_QUEUE_REUSE_CONNECTION = config('EMAIL_QUEUE_REUSE_CONNECTION', default=True, cast=bool)
+EMAIL_QUEUE_DIGEST = config('EMAIL_QUEUE_DIGEST', default=False, cast=bool)
+# Messages sent per drain at most (0 for no limit), which with
+# EMAIL_QUEUE_INTERVAL caps the SMTP send rate; the rest stays queued
+EMAIL_QUEUE_MAX_PER_RUN = config('EMAIL_QUEUE_MAX_PER_RUN', default=0, cast=int)
+
 
 # REST Framework authentication
 REST_FRAMEWORK = {
+    # Cheapest first: cached JWT users, then the session, and basic auth
+    # (a full password hash per request) last
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
+        'taskmanagerapp.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
+        'rest_framework.authentication.BasicAuthentication'
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Task
+from . import search
+from .models import ArchivedTask, NotificationSubscription, Task
 
 
 @admin.register(Task)
@@ -21,3 +22,52 @@ class TaskAdmin(admin.ModelAdmin):
         'description'
     )
     ordering = ('-deadline',)
+    list_select_related = ('assignee',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).only(
+            'title',
+            'description',
+            'status',
+            'startDate',
+            'deadline',
+            'priority',
+            'assignee__id',
+            'assignee__username'
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the search index instead of ILIKE scans over search_fields
+        if not search_term:
+            return queryset, False
+        return search.search_tasks(queryset, search_term), False
+
+
+@admin.register(NotificationSubscription)
+class NotificationSubscriptionAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'assignee',
+        'priority')
+    list_filter = (
+        'priority',
+    )
+    list_select_related = ('user', 'assignee')
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'title',
+        'assignee',
+        'deadline',
+        'priority',
+        'archived_at')
+    list_filter = (
+        'priority',
+    )
+    ordering = ('-archived_at',)
+    list_select_related = ('assignee',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
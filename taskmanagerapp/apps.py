@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TaskmanagerappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'taskmanagerapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,98 @@
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from . import cache, events, stats
+from .models import ArchivedTask, PendingTaskNotification, Task, TaskSearchToken
+
+
+# Archiving of finished tasks. Done tasks not modified for TASK_ARCHIVE_AFTER
+# are moved to ArchivedTask, so listings, sorts and indexes of the active
+# table only cover live work (listings add the archive on request). Every
+# batch is one short transaction. Rows locked by a writer are skipped, and on
+# PostgreSQL a batch waits at most TASK_ARCHIVE_LOCK_TIMEOUT_MS for a lock
+# before giving up, so archiving never holds writes back for long.
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'status',
+    'assignee_id',
+    'startDate',
+    'deadline',
+    'priority',
+    'last_modified'
+]
+
+LOCK_NOT_AVAILABLE = '55P03'  # pgcode of a PostgreSQL lock_timeout
+
+
+# Helper Functions
+def set_lock_timeout():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{int(settings.TASK_ARCHIVE_LOCK_TIMEOUT_MS)}ms'")
+
+
+def delete_tasks(task_ids):
+    # A raw delete, without the collector. Skipping the post_delete receiver
+    # of Task is the point: it adjusts the statistics, invalidates the cache
+    # and publishes an event per task, which the callers do once per batch.
+    # The CASCADE is done here instead: TaskSearchToken and
+    # PendingTaskNotification are the only models referencing Task, a new
+    # one must be deleted here too.
+    TaskSearchToken.objects.filter(task_id__in=task_ids).delete()
+    PendingTaskNotification.objects.filter(task_id__in=task_ids).delete()
+    tasks = Task.objects.filter(pk__in=task_ids)
+    tasks._raw_delete(tasks.db)
+
+
+def archive_batch(cutoff, batch_size):
+    with transaction.atomic():
+        set_lock_timeout()
+        rows = list(
+            Task.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Task.Status.DONE, last_modified__lt=cutoff)
+            .order_by('last_modified')
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedTask.objects.bulk_create([ArchivedTask(**row) for row in rows], ignore_conflicts=True)
+        delete_tasks([row['id'] for row in rows])
+        # One statistics update per key, instead of one per task from
+        # post_delete, keeps the TaskStat rows locked only briefly
+        counts = Counter((row['assignee_id'], row['status'], row['priority']) for row in rows)
+        stats.adjust({key: -count for key, count in counts.items()})
+
+    cache.invalidate({row['assignee_id'] for row in rows})
+    deleted = [(row['id'], row['assignee_id']) for row in rows]
+    transaction.on_commit(lambda: events.publish_deleted(deleted))
+    return len(rows)
+
+
+def archive(batch_size=None):
+    if batch_size is None:
+        batch_size = settings.TASK_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - settings.TASK_ARCHIVE_AFTER
+
+    archived = 0
+    while True:
+        try:
+            count = archive_batch(cutoff, batch_size)
+        except OperationalError as e:
+            if getattr(e.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE:
+                raise
+            logger.info('Archiving stopped on a lock timeout, the next run continues')
+            break
+        archived += count
+        if count < batch_size:
+            break
+    return archived
@@ -0,0 +1,3 @@
+from .runner import run_benchmarks
+
+__all__ = ('run_benchmarks',)
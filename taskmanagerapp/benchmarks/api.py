@@ -0,0 +1,119 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from taskmanagerapp import services
+from taskmanagerapp.models import Task
+from taskmanagerapp.serializers import TaskSerializer, serialize_task_rows, task_rows
+
+from .data import best_of, ms, per_second
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+# API benchmarks, run in-process through the full request stack (JWT
+# authentication, views, services and the list cache)
+
+# Helper Functions
+def get_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+def request(client, method, path, data=None):
+    # (seconds, query count) of one request
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if data is None:
+            response = getattr(client, method)(path)
+        else:
+            response = getattr(client, method)(path, data, format='json')
+        elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}: {response.content[:200]!r}')
+    return elapsed, len(queries)
+
+
+def summarize(timings):
+    latencies = [seconds for seconds, _ in timings]
+    return {
+        'requests': len(timings),
+        'per_second': per_second(len(timings), sum(latencies)),
+        'p50_ms': ms(statistics.median(latencies)),
+        'max_ms': ms(max(latencies)),
+        'queries_per_request': round(sum(queries for _, queries in timings) / len(timings), 2)
+    }
+
+
+# Benchmarks
+def list_latency(user, repeat, page_size):
+    # Best-of latency per sort key, with the cache cleared (cold) and filled
+    client = get_client(user)
+    results = {}
+    for sort_by in services.SORT_FIELDS:
+        for order in ['asc', 'desc']:
+            path = f"{reverse('task-list-api')}?sort={sort_by}&order={order}&page_size={page_size}"
+            cold = []
+            for _ in range(repeat):
+                cache.clear()
+                cold.append(request(client, 'get', path))
+            warm = [request(client, 'get', path) for _ in range(repeat)]
+            results[f'{sort_by}:{order}'] = {
+                'cold_ms': ms(min(seconds for seconds, _ in cold)),
+                'warm_ms': ms(min(seconds for seconds, _ in warm)),
+                'cold_queries': cold[-1][1],
+                'warm_queries': warm[-1][1]
+            }
+    return results
+
+
+def serializer_time(user, repeat):
+    tasks = services.list_tasks(user)
+    rows = max(tasks.count(), 1)
+    slow = best_of(repeat, lambda: TaskSerializer(tasks.all(), many=True).data)
+    fast = best_of(repeat, lambda: serialize_task_rows(task_rows(tasks.all())))
+    return {
+        'rows': rows,
+        'serializer_us_per_row': round(slow / rows * 1e6, 3),
+        'fast_path_us_per_row': round(fast / rows * 1e6, 3)
+    }
+
+
+def create_throughput(user, assignees, count):
+    client = get_client(user)
+    now = timezone.now()
+    timings = []
+    for i in range(count):
+        timings.append(request(client, 'post', reverse('task-list-api'), {
+            'title': f'Benchmark task {i}',
+            'description': 'Created by benchmark',
+            'status': 'To Do',
+            'assignee': assignees[i % len(assignees)].id,
+            'startDate': now.strftime(DATETIME_FORMAT),
+            'deadline': (now + timedelta(days=1)).strftime(DATETIME_FORMAT),
+            'priority': 'Low'
+        }))
+    return summarize(timings)
+
+
+def patch_throughput(user, count):
+    # Deadline changes, which also queue update notifications
+    client = get_client(user)
+    now = timezone.now()
+    task_ids = list(Task.objects.order_by('id').values_list('id', flat=True)[:count])
+    timings = []
+    for i, pk in enumerate(task_ids):
+        timings.append(request(client, 'patch', reverse('task-detail-api', args=[pk]), {
+            'deadline': (now + timedelta(days=2, minutes=i)).strftime(DATETIME_FORMAT)
+        }))
+    return summarize(timings)
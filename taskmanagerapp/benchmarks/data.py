@@ -0,0 +1,65 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from taskmanagerapp.models import Task
+
+
+# Helper Functions
+def seed(task_count, user_count, seed=0, label='benchmark', superuser=None):
+    # Seeded with plain bulk_create, so without search tokens or stat rows.
+    # Shared by the benchmark, explaintasks, loadtest and benchserializer
+    # commands; label names the users and tasks.
+    rng = random.Random(seed)
+    # Unique per run, two runs can start within the same second
+    prefix = f'{label}-{uuid.uuid4().hex[:12]}'
+    if superuser is None:
+        superuser = User.objects.create_superuser(
+            username=f'{prefix}-admin',
+            email=f'{prefix}-admin@example.com',
+            password=None
+        )
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}-user{i}', email=f'{prefix}-user{i}@example.com')
+        for i in range(user_count)
+    ])
+
+    now = timezone.now()
+    statuses = [choice.value for choice in Task.Status]
+    priorities = [choice.value for choice in Task.Priority]
+    Task.objects.bulk_create(
+        (
+            Task(
+                title=f'Task {i}',
+                description=f'Seeded by {label}',
+                status=rng.choice(statuses),
+                assignee=rng.choice(users),
+                startDate=now + timedelta(hours=rng.randint(-720, 720)),
+                deadline=now + timedelta(hours=rng.randint(-720, 720)),
+                priority=rng.choice(priorities)
+            ) for i in range(task_count)
+        ),
+        batch_size=1000
+    )
+    return superuser, users
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def per_second(count, seconds):
+    return round(count / seconds, 1) if seconds else None
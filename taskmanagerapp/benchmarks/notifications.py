@@ -0,0 +1,41 @@
+import time
+
+from django.core import mail as django_mail
+
+from taskmanagerapp import mail, outbox
+from taskmanagerapp.tasks import send_task_email_to_assignee_updated
+
+from .data import per_second
+
+
+# Notification pipeline benchmark: jobs written to the outbox, published by
+# the relay (run eagerly, so the jobs queue their mails inline) and the mail
+# queue drained to the locmem backend
+
+def pipeline_rate(assignees, count):
+    django_mail.outbox = []
+
+    start = time.perf_counter()
+    for i in range(count):
+        assignee = assignees[i % len(assignees)]
+        outbox.enqueue(send_task_email_to_assignee_updated, assignee.email, assignee.username, f'Benchmark task {i}')
+    enqueued = time.perf_counter() - start
+
+    # Includes the due jobs the API benchmarks queued
+    start = time.perf_counter()
+    published = outbox.relay()
+    relayed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sent = mail.send_queued_emails()
+    drained = time.perf_counter() - start
+
+    return {
+        'enqueued': count,
+        'enqueue_per_second': per_second(count, enqueued),
+        'published': published,
+        'relay_per_second': per_second(published, relayed),
+        'mails_sent': sent,
+        'mail_per_second': per_second(sent, drained),
+        'locmem_outbox': len(django_mail.outbox)
+    }
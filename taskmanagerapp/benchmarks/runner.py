@@ -0,0 +1,60 @@
+import platform
+
+import django
+from celery import current_app
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import api, data, notifications
+
+
+# Benchmarks run on seeded data inside a transaction that is rolled back.
+# Celery runs eagerly and mail goes to the locmem backend, so a run needs no
+# broker or SMTP server and measures this process only.
+
+BENCHMARK_SETTINGS = {
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+        }
+    },
+    'ALLOWED_HOSTS': ['testserver'],
+    'TASK_EVENTS_ENABLED': False,
+}
+
+
+def run_benchmarks(tasks=1000, users=10, repeat=3, writes=100, notification_count=500, page_size=100, seed=0):
+    results = {
+        'meta': {
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'tasks': tasks,
+            'users': users,
+            'repeat': repeat,
+            'writes': writes,
+            'notifications': notification_count,
+            'page_size': page_size,
+            'seed': seed
+        }
+    }
+
+    eager = current_app.conf.task_always_eager, current_app.conf.task_eager_propagates
+    current_app.conf.task_always_eager = True
+    current_app.conf.task_eager_propagates = True
+    try:
+        with override_settings(**BENCHMARK_SETTINGS), transaction.atomic():
+            superuser, assignees = data.seed(tasks, users, seed)
+            results['list'] = api.list_latency(superuser, repeat, page_size)
+            results['serializer'] = api.serializer_time(superuser, repeat)
+            results['create'] = api.create_throughput(superuser, assignees, writes)
+            results['patch'] = api.patch_throughput(superuser, writes)
+            results['notifications'] = notifications.pipeline_rate(assignees, notification_count)
+            transaction.set_rollback(True)
+    finally:
+        current_app.conf.task_always_eager, current_app.conf.task_eager_propagates = eager
+    return results
@@ -0,0 +1,151 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+
+# Cache for serialized task lists. Every list is cached under the current
+# generation of its scope (an assignee id, or 'all' for the superuser list).
+# Writes bump the generation, so stale entries are never read again and just
+# expire. The bump is repeated on commit, see invalidate().
+
+PREFIX = 'tasklist'
+ALL_SCOPE = 'all'
+
+
+# Helper Functions
+def generation_key(scope):
+    return f'{PREFIX}:gen:{scope}'
+
+
+def modified_key(scope):
+    return f'{PREFIX}:modified:{scope}'
+
+
+def stat_key(name):
+    return f'{PREFIX}:stats:{name}'
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # incr fails on missing keys, add is a no-op if another process won
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_generation(scope):
+    key = generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock so an evicted counter never reuses old entries
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(scope):
+    key = generation_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def list_key(scope, sort_by, order, page, generation=None):
+    if generation is None:
+        generation = get_generation(scope)
+    page_hash = hashlib.md5(str(page).encode()).hexdigest()
+    return f'{PREFIX}:{scope}:{generation}:{sort_by}:{order}:{page_hash}'
+
+
+# Async counterparts for the ASGI views, sharing the same keys
+async def aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+async def aget_generation(scope):
+    key = generation_key(scope)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+# Cache access
+def get_or_set(scope, sort_by, order, page, build):
+    key = list_key(scope, sort_by, order, page)
+    data = cache.get(key)
+    metrics.record_cache(data is not None)
+    if data is None:
+        increment(stat_key('misses'))
+        data = build()
+        cache.set(key, data, timeout=settings.TASK_LIST_CACHE_TIMEOUT)
+    else:
+        increment(stat_key('hits'))
+    return data
+
+
+async def aget_or_set(scope, sort_by, order, page, build):
+    # build is a coroutine function
+    key = list_key(scope, sort_by, order, page, await aget_generation(scope))
+    data = await cache.aget(key)
+    metrics.record_cache(data is not None)
+    if data is None:
+        await aincrement(stat_key('misses'))
+        data = await build()
+        await cache.aset(key, data, timeout=settings.TASK_LIST_CACHE_TIMEOUT)
+    else:
+        await aincrement(stat_key('hits'))
+    return data
+
+
+def bump_scopes(scopes):
+    modified = time.time()
+    for scope in scopes:
+        bump_generation(scope)
+        cache.set(modified_key(scope), modified, timeout=None)
+
+
+def invalidate(assignee_ids):
+    # Writers call this inside their transaction. A reader running before the
+    # commit can still build a list from the old rows and cache it under the
+    # new generation, so the generation is bumped again once the change is
+    # committed (right away outside a transaction).
+    scopes = {assignee_id for assignee_id in assignee_ids if assignee_id is not None}
+    scopes.add(ALL_SCOPE)
+    bump_scopes(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_scopes(scopes))
+
+
+def get_last_modified(scope, fallback):
+    # Unix timestamp of the last write in scope, fallback() recomputes it
+    key = modified_key(scope)
+    modified = cache.get(key)
+    if modified is None:
+        modified = fallback()
+        if modified is not None:
+            cache.add(key, modified, timeout=None)
+    return modified
+
+
+def get_stats():
+    hits = cache.get(stat_key('hits'), 0)
+    misses = cache.get(stat_key('misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0
+    }
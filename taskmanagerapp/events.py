@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+
+import redis
+import redis.asyncio
+
+from django.conf import settings
+
+from .models import Task
+from .serializers import serialize_task_rows, task_rows
+
+
+# Live task change events. Writes publish a delta per affected assignee to
+# Redis pub/sub, and every ASGI worker process keeps one pattern subscription
+# that fans the deltas out to its connected SSE clients.
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'task-events'
+ALL_CHANNEL = 'all'
+
+redis_client = None
+
+
+# Helper Functions
+def channel_name(scope):
+    return f'{CHANNEL_PREFIX}:{scope}'
+
+
+def get_redis_client():
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+    return redis_client
+
+
+def format_event(action, data):
+    return f'event: {action}\ndata: {json.dumps(data)}\n\n'
+
+
+# Publishing
+def publish(events):
+    # events are (scopes, action, data) tuples
+    if not events or not settings.TASK_EVENTS_ENABLED:
+        return
+    try:
+        pipeline = get_redis_client().pipeline(transaction=False)
+        for scopes, action, data in events:
+            message = json.dumps({'action': action, 'data': data})
+            for scope in scopes:
+                pipeline.publish(channel_name(scope), message)
+        pipeline.execute()
+    except redis.RedisError:
+        # Live updates are best effort and must never fail a write
+        logger.warning('Could not publish task events', exc_info=True)
+
+
+def publish_saved(task_ids, previous_assignees=None):
+    previous_assignees = previous_assignees or {}
+    rows = serialize_task_rows(task_rows(Task.objects.filter(pk__in=task_ids)))
+    events = []
+    for row in rows:
+        events.append(([row['assignee'], ALL_CHANNEL], 'saved', row))
+        previous = previous_assignees.get(row['id'])
+        if previous is not None and previous != row['assignee']:
+            # The task left the previous assignee's list
+            events.append(([previous], 'deleted', {'id': row['id']}))
+    publish(events)
+
+
+def publish_deleted(tasks):
+    # tasks are (task_id, assignee_id) pairs
+    publish([
+        ([assignee_id, ALL_CHANNEL], 'deleted', {'id': task_id})
+        for task_id, assignee_id in tasks
+    ])
+
+
+# Fan-out
+class TaskEventBroadcaster:
+
+    def __init__(self):
+        self.loop = None
+        self.listener = None
+        self.subscribers = {}
+
+    def subscribe(self, scope):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # A new event loop (e.g. a fresh async_to_sync call) starts over
+            self.loop = loop
+            self.listener = None
+            self.subscribers = {}
+
+        queue = asyncio.Queue(maxsize=settings.TASK_EVENTS_QUEUE_SIZE)
+        self.subscribers.setdefault(channel_name(scope), set()).add(queue)
+        if self.listener is None or self.listener.done():
+            self.listener = loop.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, scope, queue):
+        queues = self.subscribers.get(channel_name(scope))
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[channel_name(scope)]
+
+    def dispatch(self, channel, data):
+        for queue in list(self.subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # A client that stopped reading misses deltas instead of
+                # growing the worker's memory
+                pass
+
+    async def listen(self):
+        # One pattern subscription per worker process, reconnecting while
+        # there are clients to serve
+        while self.subscribers:
+            client = redis.asyncio.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(channel_name('*'))
+                async for message in pubsub.listen():
+                    if message['type'] == 'pmessage':
+                        self.dispatch(message['channel'].decode(), message['data'].decode())
+            except redis.RedisError:
+                logger.warning('Task event listener lost its Redis connection', exc_info=True)
+                await asyncio.sleep(settings.TASK_EVENTS_RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+broadcaster = TaskEventBroadcaster()
+
+
+async def stream_events(scope):
+    queue = broadcaster.subscribe(scope)
+    try:
+        yield ': connected\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.TASK_EVENTS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Comment line that keeps proxies from closing idle streams
+                yield ': keepalive\n\n'
+                continue
+            event = json.loads(message)
+            yield format_event(event['action'], event['data'])
+    finally:
+        broadcaster.unsubscribe(scope, queue)
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .serializers import TASK_ROW_FIELDS, serialize_task_row
+
+
+# Streaming task exports. Rows are read through iterator(chunk_size), which
+# uses a server-side cursor on PostgreSQL, and written one chunk at a time, so
+# memory stays flat however many tasks are exported. Under ASGI the chunks are
+# fetched one at a time through sync_to_async, as Django would otherwise read
+# a sync iterator into a list before sending it.
+#
+# Formats:
+# - csv and ndjson, with the fields and date format of the task API
+# - columnar, a compact binary format for analysts. After the MAGIC bytes and
+#   a length-prefixed JSON header listing the columns, every chunk of rows is
+#   one block: a uint32 row count followed by each column as a uint32 byte
+#   length and its data. A block with 0 rows ends the file. All numbers are
+#   little-endian. Column data per type:
+#     int64       one signed 64-bit integer per row
+#     timestamp   int64 seconds since the epoch, UTC
+#     string      uint32 end offset per row, then the UTF-8 bytes
+#     dictionary  uint16 code per row, uint32 entry count, then the entries
+#                 as a string column
+
+STREAM_CHUNK_SIZE = 2000
+MAX_CHUNK_SIZE = 65535  # Dictionary codes are uint16
+FORMATS = ['csv', 'ndjson', 'columnar']
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/octet-stream',
+}
+EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'columnar': 'taskcol'}
+
+CSV_FIELDS = ['id', 'title', 'description', 'assignee', 'assignee_username', 'status', 'startDate', 'deadline', 'priority']
+
+MAGIC = b'TASKCOL\x01'
+COLUMNS = [
+    ('id', 'int64'),
+    ('title', 'string'),
+    ('description', 'string'),
+    ('assignee', 'int64'),
+    ('assignee_username', 'dictionary'),
+    ('status', 'dictionary'),
+    ('startDate', 'timestamp'),
+    ('deadline', 'timestamp'),
+    ('priority', 'dictionary'),
+]
+# Columns named differently in task_rows()
+ROW_FIELDS = {'assignee': 'assignee_id', 'assignee_username': 'assignee__username'}
+UINT32 = struct.Struct('<I')
+
+
+# Helper Functions
+def iter_chunks(rows, chunk_size):
+    # Lists of task_rows() tuples, in the order of the queryset
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode_strings(values):
+    data = bytearray()
+    offsets = array('I')
+    for value in values:
+        data += value.encode()
+        offsets.append(len(data))
+    return little_endian(offsets) + bytes(data)
+
+
+def decode_strings(data, count):
+    offsets = from_little_endian('I', data[:count * 4])
+    data = data[count * 4:]
+    values = []
+    start = 0
+    for end in offsets:
+        values.append(data[start:end].decode())
+        start = end
+    return values
+
+
+def encode_column(kind, values):
+    if kind == 'int64':
+        return little_endian(array('q', values))
+    if kind == 'timestamp':
+        return little_endian(array('q', (int(value.timestamp()) for value in values)))
+    if kind == 'string':
+        return encode_strings(values)
+    # dictionary
+    entries = {}
+    codes = array('H', (entries.setdefault(value, len(entries)) for value in values))
+    return little_endian(codes) + UINT32.pack(len(entries)) + encode_strings(entries)
+
+
+def decode_column(kind, data, count):
+    if kind == 'int64':
+        return from_little_endian('q', data).tolist()
+    if kind == 'timestamp':
+        return [datetime.fromtimestamp(value, dt_timezone.utc) for value in from_little_endian('q', data)]
+    if kind == 'string':
+        return decode_strings(data, count)
+    codes = from_little_endian('H', data[:count * 2])
+    entry_count, = UINT32.unpack_from(data, count * 2)
+    entries = decode_strings(data[count * 2 + UINT32.size:], entry_count)
+    return [entries[code] for code in codes]
+
+
+def read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError('Truncated columnar export.')
+    return data
+
+
+# Writers, yielding bytes one chunk at a time
+def iter_csv(rows, chunk_size=STREAM_CHUNK_SIZE):
+    tz = timezone.get_current_timezone()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for chunk in iter_chunks(rows, chunk_size):
+        for row in chunk:
+            writer.writerow(serialize_task_row(row, tz).values())
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def iter_ndjson(rows, chunk_size=STREAM_CHUNK_SIZE):
+    tz = timezone.get_current_timezone()
+    for chunk in iter_chunks(rows, chunk_size):
+        yield ''.join(json.dumps(serialize_task_row(row, tz)) + '\n' for row in chunk).encode()
+
+
+def iter_columnar(rows, chunk_size=STREAM_CHUNK_SIZE):
+    header = json.dumps({'columns': COLUMNS}).encode()
+    yield MAGIC + UINT32.pack(len(header)) + header
+
+    indexes = [TASK_ROW_FIELDS.index(ROW_FIELDS.get(name, name)) for name, _ in COLUMNS]
+    for chunk in iter_chunks(rows, chunk_size):
+        block = [UINT32.pack(len(chunk))]
+        for (_, kind), index in zip(COLUMNS, indexes):
+            data = encode_column(kind, [row[index] for row in chunk])
+            block.append(UINT32.pack(len(data)))
+            block.append(data)
+        yield b''.join(block)
+    yield UINT32.pack(0)
+
+
+WRITERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'columnar': iter_columnar}
+
+
+def iter_export(rows, export_format, chunk_size=STREAM_CHUNK_SIZE):
+    # rows is a filtered and ordered task_rows() queryset
+    if export_format not in WRITERS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}.")
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f'chunk_size must be between 1 and {MAX_CHUNK_SIZE}.')
+    return WRITERS[export_format](rows, chunk_size)
+
+
+async def aiter_export(chunks):
+    # Each chunk is produced in the thread of the database connection
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def stream_export(rows, export_format, chunk_size=STREAM_CHUNK_SIZE, attachment=True, asynchronous=False):
+    # asynchronous for requests served under ASGI
+    chunks = iter_export(rows, export_format, chunk_size)
+    response = StreamingHttpResponse(
+        aiter_export(chunks) if asynchronous else chunks,
+        content_type=CONTENT_TYPES[export_format]
+    )
+    if attachment:
+        response['Content-Disposition'] = f'attachment; filename="tasks.{EXTENSIONS[export_format]}"'
+    return response
+
+
+# Reader
+def read_columnar(stream):
+    # Yields the rows of a columnar export as dicts, one block at a time
+    if read_exact(stream, len(MAGIC)) != MAGIC:
+        raise ValueError('Not a columnar task export.')
+    header_size, = UINT32.unpack(read_exact(stream, UINT32.size))
+    columns = json.loads(read_exact(stream, header_size))['columns']
+
+    while True:
+        count, = UINT32.unpack(read_exact(stream, UINT32.size))
+        if not count:
+            return
+        values = []
+        for name, kind in columns:
+            size, = UINT32.unpack(read_exact(stream, UINT32.size))
+            values.append(decode_column(kind, read_exact(stream, size), count))
+        names = [name for name, _ in columns]
+        for row in zip(*values):
+            yield dict(zip(names, row))
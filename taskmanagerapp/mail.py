@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+
+from . import metrics
+from .models import QueuedEmail
+
+
+# Notification mails are queued here and sent in chunks by send_queued_emails,
+# so a burst of notifications shares SMTP connections instead of opening one
+# per message.
+
+# Helper Functions
+@contextmanager
+def smtp_connection():
+    # Like get_connection() as a context manager, recording the time spent
+    # opening and closing the SMTP session
+    connection = get_connection()
+    start = time.perf_counter()
+    connection.open()
+    metrics.count('smtp_seconds_total', time.perf_counter() - start)
+    try:
+        yield connection
+    finally:
+        start = time.perf_counter()
+        connection.close()
+        metrics.count('smtp_seconds_total', time.perf_counter() - start)
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    QueuedEmail.objects.bulk_create([
+        QueuedEmail(
+            subject=subject,
+            message=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipient=recipient
+        ) for recipient in recipient_list if recipient
+    ])
+
+
+def build_messages(queued_emails, digest=False):
+    if not digest:
+        return [
+            EmailMessage(
+                subject=queued.subject,
+                body=queued.message,
+                from_email=queued.from_email,
+                to=[queued.recipient]
+            ) for queued in queued_emails
+        ]
+
+    # Digest mode: one mail per recipient for everything queued in the chunk
+    by_recipient = {}
+    for queued in queued_emails:
+        by_recipient.setdefault(queued.recipient, []).append(queued)
+
+    messages = []
+    for recipient, group in by_recipient.items():
+        if len(group) == 1:
+            subject = group[0].subject
+            body = group[0].message
+        else:
+            subject = f'{len(group)} task notifications'
+            body = '\n\n----------\n\n'.join(
+                f'{queued.subject}\n\n{queued.message}' for queued in group
+            )
+        messages.append(EmailMessage(
+            subject=subject,
+            body=body,
+            from_email=group[0].from_email,
+            to=[recipient]
+        ))
+    return messages
+
+
+def send_queued_chunk(connection, batch_size, digest):
+    # Rows stay locked until the chunk is sent, so a failed send leaves them
+    # queued for the next run and concurrent workers skip them.
+    with transaction.atomic():
+        queued_emails = list(
+            QueuedEmail.objects
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not queued_emails:
+            return 0
+
+        messages = build_messages(queued_emails, digest)
+        start = time.perf_counter()
+        connection.send_messages(messages)
+        metrics.count('smtp_seconds_total', time.perf_counter() - start)
+        metrics.count('smtp_messages_total', len(messages))
+        QueuedEmail.objects.filter(pk__in=[queued.pk for queued in queued_emails]).delete()
+    return len(queued_emails)
+
+
+def send_queued_emails(batch_size=None, reuse_connection=None, digest=None, max_messages=None):
+    if batch_size is None:
+        batch_size = settings.EMAIL_QUEUE_BATCH_SIZE
+    if reuse_connection is None:
+        reuse_connection = settings.EMAIL_QUEUE_REUSE_CONNECTION
+    if digest is None:
+        digest = settings.EMAIL_QUEUE_DIGEST
+    if max_messages is None:
+        max_messages = settings.EMAIL_QUEUE_MAX_PER_RUN
+
+    def next_batch_size(sent):
+        if not max_messages:
+            return batch_size
+        return min(batch_size, max_messages - sent)
+
+    sent = 0
+    if reuse_connection:
+        # One SMTP session for the whole drain
+        with smtp_connection() as connection:
+            while next_batch_size(sent) > 0:
+                count = send_queued_chunk(connection, next_batch_size(sent), digest)
+                if not count:
+                    break
+                sent += count
+    else:
+        # A fresh SMTP session per chunk
+        while next_batch_size(sent) > 0:
+            with smtp_connection() as connection:
+                count = send_queued_chunk(connection, next_batch_size(sent), digest)
+            if not count:
+                break
+            sent += count
+    return sent
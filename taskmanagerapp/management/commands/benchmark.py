@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from taskmanagerapp.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the task API and the notification pipeline on seeded data and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000, help='Number of tasks to seed')
+        parser.add_argument('--users', type=int, default=10, help='Number of assignees to seed')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per read benchmark, the best one is reported')
+        parser.add_argument('--writes', type=int, default=100, help='Create and patch requests each')
+        parser.add_argument('--notifications', type=int, default=500, help='Notification jobs to push through the pipeline')
+        parser.add_argument('--page-size', type=int, default=100, help='Page size of the list requests')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the seeded data')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            tasks=options['tasks'],
+            users=options['users'],
+            repeat=options['repeat'],
+            writes=options['writes'],
+            notification_count=options['notifications'],
+            page_size=options['page_size'],
+            seed=options['seed']
+        )
+        output = json.dumps(results, indent=2, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+        else:
+            self.stdout.write(output)
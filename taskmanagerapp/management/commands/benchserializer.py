@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from taskmanagerapp import services
+from taskmanagerapp.benchmarks.data import best_of, seed
+from taskmanagerapp.serializers import TaskSerializer, serialize_task_rows, task_rows
+
+
+class Command(BaseCommand):
+    help = 'Compare TaskSerializer with the values_list() fast path on a seeded task list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of tasks to seed')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per serializer, the best one is reported')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            superuser, _ = seed(options['rows'], 1, label='benchserializer')
+            tasks = services.list_tasks(superuser)
+
+            slow = best_of(options['repeat'], lambda: TaskSerializer(tasks.all(), many=True).data)
+            fast = best_of(options['repeat'], lambda: serialize_task_rows(task_rows(tasks.all())))
+
+            if list(TaskSerializer(tasks.all(), many=True).data) != serialize_task_rows(task_rows(tasks.all())):
+                self.stdout.write(self.style.ERROR('Fast path output differs from TaskSerializer'))
+
+            rows = options['rows']
+            self.stdout.write(f'TaskSerializer: {slow * 1000:.1f} ms ({slow / rows * 1e6:.1f} us/row)')
+            self.stdout.write(f'Fast path:      {fast * 1000:.1f} ms ({fast / rows * 1e6:.1f} us/row)')
+            self.stdout.write(self.style.SUCCESS(f'Speedup: {slow / fast:.1f}x'))
+
+            transaction.set_rollback(True)
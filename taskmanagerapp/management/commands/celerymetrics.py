@@ -0,0 +1,95 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from taskmanagerapp import metrics
+
+
+class Command(BaseCommand):
+    help = 'Print a live summary of the Celery task metrics per task name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between summaries')
+        parser.add_argument('--once', action='store_true', help='Print one summary and exit')
+
+    def handle(self, *args, **options):
+        previous = None
+        while True:
+            # Workers share their totals every METRICS_FLUSH_INTERVAL seconds
+            tasks = self.summarize(metrics.collect(include_self=False))
+            self.print_summary(tasks, previous, options['interval'])
+            if options['once']:
+                return
+            previous = tasks
+            time.sleep(options['interval'])
+
+    def summarize(self, totals):
+        tasks = defaultdict(lambda: {
+            'runs': 0,
+            'failures': 0,
+            'smtp_seconds': 0.0,
+            'smtp_messages': 0,
+            'eta_held': 0,
+            'wait': None,
+            'run': None
+        })
+        for (name, labels), value in totals['counters'].items():
+            labels = dict(labels)
+            if name == 'celery_task_runs_total':
+                tasks[labels['task']]['runs'] += value
+                if labels['state'] == 'FAILURE':
+                    tasks[labels['task']]['failures'] += value
+            elif name == 'celery_task_smtp_seconds_total':
+                tasks[labels['task']]['smtp_seconds'] += value
+            elif name == 'celery_task_smtp_messages_total':
+                tasks[labels['task']]['smtp_messages'] += value
+        for (name, labels), value in totals['gauges'].items():
+            tasks[dict(labels)['task']]['eta_held'] += value
+        for (name, labels), histogram in totals['histograms'].items():
+            if name == 'celery_task_queue_wait_seconds':
+                tasks[dict(labels)['task']]['wait'] = histogram
+            elif name == 'celery_task_run_seconds':
+                tasks[dict(labels)['task']]['run'] = histogram
+        return dict(tasks)
+
+    def print_summary(self, tasks, previous, interval):
+        self.stdout.write(time.strftime('%H:%M:%S'))
+        if not tasks:
+            self.stdout.write('No Celery task metrics yet')
+            return
+
+        self.stdout.write(
+            f"{'task':<45} {'runs':>7} {'run/s':>6} {'fail':>5} {'wait avg':>9} {'wait p95':>9} "
+            f"{'run avg':>9} {'run p95':>9} {'smtp/run':>9} {'smtp %':>6} {'eta held':>8}"
+        )
+        for name, task in sorted(tasks.items()):
+            rate = ''
+            if previous is not None:
+                rate = f"{(task['runs'] - previous.get(name, {}).get('runs', 0)) / interval:.1f}"
+            run_seconds = task['run']['sum'] if task['run'] else 0.0
+            smtp_per_run = task['smtp_seconds'] / task['runs'] if task['runs'] else 0.0
+            smtp_share = f"{task['smtp_seconds'] / run_seconds * 100:.0f}" if run_seconds else '-'
+            self.stdout.write(
+                f"{name.rsplit('.', 1)[-1]:<45} {task['runs']:>7} {rate:>6} {task['failures']:>5} "
+                f"{self.mean(task['wait']):>9} {self.p95(task['wait']):>9} "
+                f"{self.mean(task['run']):>9} {self.p95(task['run']):>9} "
+                f"{smtp_per_run * 1000:>7.1f}ms {smtp_share:>6} {task['eta_held']:>8}"
+            )
+        self.stdout.write('')
+
+    def mean(self, histogram):
+        if not histogram or not histogram['count']:
+            return '-'
+        return f"{histogram['sum'] / histogram['count'] * 1000:.1f}ms"
+
+    def p95(self, histogram):
+        # Upper bound of the bucket holding the 95th percentile
+        if not histogram or not histogram['count']:
+            return '-'
+        cumulative = 0
+        for bound, bucket_count in zip(metrics.DURATION_BUCKETS, histogram['buckets']):
+            cumulative += bucket_count
+            if cumulative >= histogram['count'] * 0.95:
+                return f'<{bound * 1000:g}ms'
+        return f'>{metrics.DURATION_BUCKETS[-1]:g}s'
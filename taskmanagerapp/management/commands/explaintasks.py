@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from taskmanagerapp import services
+from taskmanagerapp.benchmarks.data import seed
+from taskmanagerapp.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Seed tasks and print EXPLAIN output and timings for every task list query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Number of tasks to seed')
+        parser.add_argument('--users', type=int, default=50, help='Number of assignees to seed')
+        parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data instead of rolling it back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            superuser, users = seed(options['tasks'], options['users'], label='explain')
+            self.stdout.write(f"Seeded {options['tasks']} tasks for {options['users']} users")
+            self.analyze_tables()
+
+            seq_scans = 0
+            for label, tasks in self.get_queries(superuser, users[0]):
+                seq_scans += self.explain(label, tasks, options['analyze'])
+
+            if seq_scans:
+                self.stdout.write(self.style.WARNING(f'{seq_scans} queries fall back to a sequential scan'))
+            else:
+                self.stdout.write(self.style.SUCCESS('No query falls back to a sequential scan'))
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def analyze_tables(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {Task._meta.db_table}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def get_queries(self, superuser, assignee):
+        # Every sort/filter combination TaskListApiView accepts
+        for sort_by in services.SORT_FIELDS:
+            for order in ['asc', 'desc']:
+                yield (
+                    f'all sort={sort_by} order={order}',
+                    services.list_tasks(superuser, None, sort_by, order)
+                )
+                yield (
+                    f'assignee sort={sort_by} order={order}',
+                    services.list_tasks(superuser, assignee.id, sort_by, order)
+                )
+
+        # The deadline-warning scan, as send_deadline_warnings runs it
+        now = timezone.now()
+        yield (
+            'open tasks due within the warning window',
+            Task.objects.exclude(status=Task.Status.DONE).filter(
+                warned_at__isnull=True,
+                deadline__gt=now,
+                deadline__lte=now + settings.DEADLINE_WARNING_WINDOW
+            ).order_by('deadline')[:settings.DEADLINE_WARNING_BATCH_SIZE]
+        )
+
+    def explain(self, label, tasks, analyze):
+        if analyze and connection.vendor == 'postgresql':
+            plan = tasks.explain(analyze=True)
+        else:
+            plan = tasks.explain()
+
+        start = time.perf_counter()
+        row_count = len(list(tasks))
+        elapsed = (time.perf_counter() - start) * 1000
+
+        seq_scan = self.is_seq_scan(plan)
+        style = self.style.WARNING if seq_scan else self.style.SUCCESS
+        self.stdout.write(style(f'{label}: {row_count} rows in {elapsed:.1f} ms'))
+        self.stdout.write(plan)
+        self.stdout.write('')
+        return int(seq_scan)
+
+    def is_seq_scan(self, plan):
+        table = Task._meta.db_table
+        if connection.vendor == 'postgresql':
+            return f'Seq Scan on {table}' in plan
+        return any(
+            line.strip().endswith(f'SCAN {table}')
+            for line in plan.splitlines()
+        )
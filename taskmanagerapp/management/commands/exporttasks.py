@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmanagerapp import export, pagination, services
+from taskmanagerapp.models import ArchivedTask
+from taskmanagerapp.serializers import task_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream all tasks, or those of one assignee, to a CSV, NDJSON or columnar file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, '-' for stdout")
+        parser.add_argument('--format', choices=export.FORMATS, default='csv', help='Output format')
+        parser.add_argument('--assignee', type=int, help='Only export the tasks of this user id')
+        parser.add_argument('--sort', default='deadline', choices=services.SORT_FIELDS, help='Sort field')
+        parser.add_argument('--order', default='asc', choices=['asc', 'desc'], help='Sort order')
+        parser.add_argument('--include-archived', action='store_true', help='Add the archived tasks')
+        parser.add_argument('--chunk-size', type=int, default=export.STREAM_CHUNK_SIZE, help='Rows fetched and written at a time')
+
+    def handle(self, *args, **options):
+        tasks = services.task_queryset()
+        archived = ArchivedTask.objects.all()
+        if options['assignee'] is not None:
+            tasks = tasks.filter(assignee=options['assignee'])
+            archived = archived.filter(assignee=options['assignee'])
+        tasks = services.order_tasks(tasks, options['sort'], options['order'])
+        if options['include_archived']:
+            rows = pagination.combine(tasks, archived, options['sort'], options['order'])
+        else:
+            rows = task_rows(tasks)
+
+        try:
+            chunks = export.iter_export(rows, options['format'], options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        written = 0
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+                written += len(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['output'], 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written / 1e6:.1f} MB to {options['output']} in {elapsed:.1f} s"
+        ))
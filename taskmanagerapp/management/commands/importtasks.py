@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from taskmanagerapp import services
+from taskmanagerapp.models import Task
+from taskmanagerapp.serializers import TaskImportSerializer
+
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+class Command(BaseCommand):
+    help = 'Import tasks from a CSV or NDJSON file (or stdin), validated and inserted in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="File to import, '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format, by default from the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument(
+            '--notify',
+            choices=['send', 'defer', 'none'],
+            default='defer',
+            help='Queue the created notifications with every chunk, once after the import, or not at all'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate the rows without inserting them')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        input_format = options['format']
+        if input_format is None:
+            input_format = FORMATS.get(os.path.splitext(source)[1].lower())
+            if input_format is None:
+                raise CommandError('Cannot tell the format of the input, pass --format.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        if source == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        else:
+            try:
+                stream = open(source, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot open {source}: {e}')
+
+        with stream:
+            rows = self.read_csv(stream) if input_format == 'csv' else self.read_ndjson(stream)
+            self.load(rows, options)
+
+    # Reading rows as (line number, fields or error)
+    def read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        for fields in reader:
+            # Empty cells fall back to the model defaults
+            fields = {name: value for name, value in fields.items() if name and value not in (None, '')}
+            if 'assignee_username' in fields:
+                fields['assignee'] = fields.pop('assignee_username')
+            yield reader.line_num, fields
+
+    def read_ndjson(self, stream):
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError:
+                fields = None
+            if not isinstance(fields, dict):
+                yield line_num, 'Not a JSON object.'
+                continue
+            if 'assignee_username' in fields:
+                fields['assignee'] = fields.pop('assignee_username')
+            yield line_num, fields
+
+    # Loading
+    def load(self, rows, options):
+        chunk_size = options['chunk_size']
+        notify = options['notify']
+        dry_run = options['dry_run']
+
+        # One query for all assignees instead of one per row
+        serializer = TaskImportSerializer(context={'assignees': dict(User.objects.values_list('username', 'id'))})
+        start = time.perf_counter()
+        imported = invalid = 0
+        created_ids = []
+        chunk = []
+
+        def flush():
+            nonlocal imported
+            if chunk and not dry_run:
+                tasks = services.insert_tasks(chunk, notify=notify == 'send', publish=False)
+                if notify == 'defer':
+                    created_ids.extend(task.pk for task in tasks)
+            imported += len(chunk)
+            chunk.clear()
+            self.report(imported, invalid, start)
+
+        for line_num, fields in rows:
+            try:
+                if isinstance(fields, str):
+                    raise ValidationError(fields)
+                data = serializer.run_validation(fields)
+            except ValidationError as e:
+                invalid += 1
+                self.stderr.write(f'Line {line_num}: {json.dumps(e.detail)}')
+                continue
+            data['assignee_id'] = data.pop('assignee')
+            chunk.append(Task(**data))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        if created_ids:
+            # Queued apart from the import, one job per chunk
+            for index in range(0, len(created_ids), chunk_size):
+                with transaction.atomic():
+                    services.queue_created_notifications(created_ids[index:index + chunk_size])
+
+        elapsed = time.perf_counter() - start
+        verb = 'Validated' if dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} tasks, {invalid} invalid rows in {elapsed:.1f} s ({self.rate(imported + invalid, elapsed)} rows/s)'
+        ))
+
+    def report(self, imported, invalid, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{imported} tasks, {invalid} invalid rows ({self.rate(imported + invalid, elapsed)} rows/s)')
+
+    def rate(self, rows, elapsed):
+        return round(rows / elapsed) if elapsed > 0 else rows
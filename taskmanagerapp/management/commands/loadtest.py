@@ -0,0 +1,102 @@
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from taskmanagerapp.benchmarks.data import seed
+from taskmanagerapp.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Load test the task API under WSGI and ASGI on the same data and compare req/s and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help='Base URL of the WSGI server, e.g. http://localhost:8002')
+        parser.add_argument('--asgi-url', help='Base URL of the ASGI server, e.g. http://localhost:8001')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per target')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients')
+        parser.add_argument('--seed', type=int, default=0, help='Seed this many tasks before the run (kept)')
+        parser.add_argument('--users', type=int, default=50, help='Number of assignees to seed')
+
+    def handle(self, *args, **options):
+        targets = []
+        if options['wsgi_url']:
+            targets.append(('wsgi', options['wsgi_url'].rstrip('/'), '/api/tasks/'))
+        if options['asgi_url']:
+            targets.append(('asgi', options['asgi_url'].rstrip('/'), '/api/async/tasks/'))
+        if not targets:
+            raise CommandError('Pass --wsgi-url and/or --asgi-url.')
+
+        superuser = self.get_superuser()
+        if options['seed']:
+            seed(options['seed'], options['users'], label='loadtest', superuser=superuser)
+            self.stdout.write(f"Seeded {options['seed']} tasks for {options['users']} users")
+
+        assignee_ids = list(Task.objects.values_list('assignee_id', flat=True).distinct())
+        task_ids = list(Task.objects.values_list('pk', flat=True)[:10000])
+        if not task_ids:
+            raise CommandError('No tasks to request, run with --seed.')
+
+        token = str(RefreshToken.for_user(superuser).access_token)
+        for name, base_url, api_path in targets:
+            # Both targets get the same request mix
+            paths = self.build_paths(api_path, assignee_ids, task_ids, options['requests'])
+            self.run(name, base_url, paths, token, options['concurrency'])
+
+    def get_superuser(self):
+        user, created = User.objects.get_or_create(
+            username='loadtest-admin',
+            defaults={'is_superuser': True, 'is_staff': True}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save()
+        return user
+
+    def build_paths(self, api_path, assignee_ids, task_ids, count):
+        # Half assignee listings (first page), half task details
+        rng = random.Random(0)
+        paths = []
+        for i in range(count):
+            if i % 2:
+                paths.append(f'{api_path}{rng.choice(task_ids)}/')
+            else:
+                paths.append(f'{api_path}?assignee={rng.choice(assignee_ids)}&page_size=100')
+        return paths
+
+    def run(self, name, base_url, paths, token, concurrency):
+        local = threading.local()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def request(path):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                response = local.session.get(base_url + path, headers=headers, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(request, paths))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'{name}: {len(results) / elapsed:.1f} req/s, '
+            f'p50 {statistics.median(latencies):.1f} ms, p99 {p99:.1f} ms, '
+            f'{errors} errors ({base_url})'
+        )
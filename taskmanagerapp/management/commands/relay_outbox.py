@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from taskmanagerapp import outbox
+
+
+class Command(BaseCommand):
+    help = 'Publish notification jobs from the outbox table to Celery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Publish what is due and exit')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_RELAY_BATCH_SIZE, help='Messages per transaction')
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_RELAY_INTERVAL, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            published = outbox.relay(options['batch_size'])
+            self.stdout.write(f'Published {published} messages')
+            return
+
+        while True:
+            close_old_connections()
+            if not outbox.relay(options['batch_size']):
+                time.sleep(options['interval'])
@@ -0,0 +1,341 @@
+import logging
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Request metrics per URL name (latency histograms, database queries, cache
+# hits and Celery publishes) and Celery task metrics per task name (queue
+# wait, run time, SMTP time). Every web and worker process counts in memory
+# and flushes its totals to the cache at most every METRICS_FLUSH_INTERVAL
+# seconds, so a request or task costs no extra I/O. The metrics endpoint sums
+# the totals of all processes and renders them in the Prometheus text format.
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'metrics'
+INDEX_KEY = f'{PREFIX}:processes'
+NAMESPACE = 'taskmanager'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_QUERIES_KEPT = 5
+
+COUNTERS = {
+    'http_requests_total': 'Requests per URL name, method and status code.',
+    'db_queries_total': 'Database queries per URL name.',
+    'db_query_seconds_total': 'Time spent in database queries per URL name.',
+    'cache_hits_total': 'Task list and user cache hits per URL name.',
+    'cache_misses_total': 'Task list and user cache misses per URL name.',
+    'celery_publishes_total': 'Celery tasks published to the broker per URL name.',
+    'outbox_messages_total': 'Jobs written to the notification outbox per URL name.',
+    'celery_task_runs_total': 'Celery task runs per task name and final state.',
+    'celery_task_failures_total': 'Celery task failures per task name and exception.',
+    'celery_task_db_queries_total': 'Database queries per Celery task name.',
+    'celery_task_db_query_seconds_total': 'Time spent in database queries per Celery task name.',
+    'celery_task_smtp_seconds_total': 'Time spent talking to the SMTP server per Celery task name.',
+    'celery_task_smtp_messages_total': 'Mails sent over SMTP per Celery task name.',
+}
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': 'Request latency per URL name.',
+    'celery_task_queue_wait_seconds': 'Time from publish (or ETA) to start per Celery task name.',
+    'celery_task_run_seconds': 'Celery task run time per task name.',
+}
+
+GAUGES = {
+    'celery_eta_tasks_held': 'ETA/countdown tasks a worker holds until they are due, per task name.',
+}
+
+# Metrics of the request or Celery task being run, None outside them
+current = ContextVar('operation_metrics', default=None)
+
+lock = threading.Lock()
+counters = Counter()
+histograms = {}
+eta_held = {}  # Task id: (task name, ETA timestamp) of received ETA tasks
+running = {}  # Task id: (metrics, context token, start), of running tasks
+last_flush = 0.0
+
+
+class OperationMetrics:
+
+    def __init__(self):
+        self.counts = Counter()
+        self.slow_queries = []  # (seconds, sql), slowest first
+
+    def record_query(self, sql, seconds):
+        self.counts['db_queries_total'] += 1
+        self.counts['db_query_seconds_total'] += seconds
+        if len(self.slow_queries) < SLOW_QUERIES_KEPT or seconds > self.slow_queries[-1][0]:
+            self.slow_queries.append((seconds, sql))
+            self.slow_queries.sort(key=lambda query: query[0], reverse=True)
+            del self.slow_queries[SLOW_QUERIES_KEPT:]
+
+
+# Helper Functions
+def process_key(process):
+    return f'{PREFIX}:process:{process}'
+
+
+def get_process_id():
+    # Evaluated per flush, workers forked from a preloaded master get their own
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def count(name, value=1):
+    # Adds to a counter of the current request or task, a no-op outside them
+    operation_metrics = current.get()
+    if operation_metrics is not None:
+        operation_metrics.counts[name] += value
+
+
+def record_cache(hit):
+    count('cache_hits_total' if hit else 'cache_misses_total')
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    # Installed on every database connection, see signals.py
+    operation_metrics = current.get()
+    if operation_metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        operation_metrics.record_query(sql, time.perf_counter() - start)
+
+
+def instrument(connection):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def observe(name, labels, seconds):
+    # Called with the lock held
+    histogram = histograms.get((name, labels))
+    if histogram is None:
+        histogram = histograms[name, labels] = {'buckets': [0] * (len(DURATION_BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+    histogram['buckets'][bisect_left(DURATION_BUCKETS, seconds)] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+
+# Recording requests
+def start_request():
+    request_metrics = OperationMetrics()
+    return request_metrics, current.set(request_metrics)
+
+
+def finish_request(request, response, request_metrics, token, seconds):
+    current.reset(token)
+    match = request.resolver_match
+    view = match.view_name if match is not None else 'unmatched'
+
+    labels = (('view', view),)
+    with lock:
+        counters['http_requests_total', labels + (('method', request.method), ('status', str(response.status_code)))] += 1
+        for name, value in request_metrics.counts.items():
+            if name in COUNTERS:
+                counters[name, labels] += value
+        observe('http_request_duration_seconds', labels, seconds)
+
+    if seconds >= settings.METRICS_SLOW_REQUEST_SECONDS:
+        log_slow_request(request, view, request_metrics, seconds)
+
+
+def log_slow_request(request, view, request_metrics, seconds):
+    queries = '\n'.join(
+        f'  {query_seconds * 1000:.1f} ms: {sql}'
+        for query_seconds, sql in request_metrics.slow_queries
+    )
+    logger.warning(
+        'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms. Slowest queries:\n%s',
+        request.method,
+        request.get_full_path(),
+        view,
+        seconds * 1000,
+        request_metrics.counts['db_queries_total'],
+        request_metrics.counts['db_query_seconds_total'] * 1000,
+        queries
+    )
+
+
+# Recording Celery tasks, see the Celery signal receivers in signals.py
+def mark_published(headers):
+    # Publish time travels with the message as a custom header
+    headers['published_at'] = time.time()
+
+
+def parse_eta(eta):
+    if isinstance(eta, str):
+        eta = datetime.fromisoformat(eta)
+    return eta.timestamp()
+
+
+def receive_task(task_id, task_name, eta):
+    # Runs in the worker's main process, while prefork children run the
+    # tasks, so held tasks are counted by their ETA rather than their start
+    if eta:
+        with lock:
+            eta_held[task_id] = task_name, parse_eta(eta)
+
+
+def start_task(task_id, task):
+    task_metrics = OperationMetrics()
+    labels = (('task', task.name),)
+    # Eager tasks are not published through the broker
+    queued_at = None if task.request.is_eager else getattr(task.request, 'published_at', None)
+    if queued_at is not None and task.request.eta:
+        # ETA tasks are queued once they are due
+        queued_at = max(queued_at, parse_eta(task.request.eta))
+    with lock:
+        eta_held.pop(task_id, None)
+        if queued_at is not None:
+            observe('celery_task_queue_wait_seconds', labels, max(time.time() - queued_at, 0.0))
+    running[task_id] = task_metrics, current.set(task_metrics), time.perf_counter()
+
+
+def finish_task(task_id, task, state):
+    entry = running.pop(task_id, None)
+    if entry is None:
+        return
+    task_metrics, token, start = entry
+    seconds = time.perf_counter() - start
+    current.reset(token)
+
+    labels = (('task', task.name),)
+    with lock:
+        counters['celery_task_runs_total', labels + (('state', state or 'UNKNOWN'),)] += 1
+        for name, value in task_metrics.counts.items():
+            if f'celery_task_{name}' in COUNTERS:
+                counters[f'celery_task_{name}', labels] += value
+        observe('celery_task_run_seconds', labels, seconds)
+
+
+def record_task_failure(task, exception):
+    with lock:
+        counters['celery_task_failures_total', (('task', task.name), ('exception', type(exception).__name__))] += 1
+
+
+def forget_task(task_id):
+    # Revoked before it ran
+    with lock:
+        eta_held.pop(task_id, None)
+
+
+# Sharing between processes
+def flush_due():
+    return time.monotonic() - last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+
+def snapshot():
+    now = time.time()
+    with lock:
+        for task_id, (task_name, eta) in list(eta_held.items()):
+            if eta <= now:
+                del eta_held[task_id]
+        return {
+            'counters': dict(counters),
+            'histograms': {
+                key: dict(histogram, buckets=list(histogram['buckets']))
+                for key, histogram in histograms.items()
+            },
+            'eta_tasks': list(eta_held.values())
+        }
+
+
+def flush():
+    global last_flush
+    last_flush = time.monotonic()
+    process = get_process_id()
+    try:
+        # Totals are cumulative, so a lost write is made up by the next one
+        cache.set(process_key(process), snapshot(), timeout=settings.METRICS_PROCESS_TIMEOUT)
+        processes = cache.get(INDEX_KEY) or set()
+        if process not in processes:
+            cache.set(INDEX_KEY, processes | {process}, timeout=None)
+    except Exception:
+        # Metrics must never fail a request
+        logger.warning('Could not flush request metrics', exc_info=True)
+
+
+def collect(include_self=True):
+    # Totals of all processes that flushed within METRICS_PROCESS_TIMEOUT
+    if include_self:
+        flush()
+    processes = cache.get(INDEX_KEY) or set()
+    snapshots = cache.get_many([process_key(process) for process in processes])
+    alive = {process for process in processes if process_key(process) in snapshots}
+    if alive != processes:
+        cache.set(INDEX_KEY, alive, timeout=None)
+
+    now = time.time()
+    totals = {'counters': Counter(), 'histograms': {}, 'gauges': Counter()}
+    for data in snapshots.values():
+        totals['counters'].update(data['counters'])
+        for task_name, eta in data.get('eta_tasks', []):
+            if eta > now:
+                totals['gauges']['celery_eta_tasks_held', (('task', task_name),)] += 1
+        for key, histogram in data['histograms'].items():
+            total = totals['histograms'].setdefault(key, {'buckets': [0] * (len(DURATION_BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return totals
+
+
+def reset():
+    global last_flush
+    with lock:
+        counters.clear()
+        histograms.clear()
+        eta_held.clear()
+    last_flush = 0.0
+
+
+# Prometheus text format
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(totals):
+    lines = []
+    for kind, values, families in [('counter', totals['counters'], COUNTERS), ('gauge', totals['gauges'], GAUGES)]:
+        for name, help_text in families.items():
+            lines.append(f'# HELP {NAMESPACE}_{name} {help_text}')
+            lines.append(f'# TYPE {NAMESPACE}_{name} {kind}')
+            for (value_name, labels), value in sorted(values.items()):
+                if value_name == name:
+                    lines.append(f'{NAMESPACE}_{name}{format_labels(labels)} {format_value(value)}')
+
+    for name, help_text in HISTOGRAMS.items():
+        lines.append(f'# HELP {NAMESPACE}_{name} {help_text}')
+        lines.append(f'# TYPE {NAMESPACE}_{name} histogram')
+        for (histogram_name, labels), histogram in sorted(totals['histograms'].items()):
+            if histogram_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(DURATION_BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += bucket_count
+                lines.append(f'{NAMESPACE}_{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f"{NAMESPACE}_{name}_sum{format_labels(labels)} {format_value(histogram['sum'])}")
+            lines.append(f"{NAMESPACE}_{name}_count{format_labels(labels)} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
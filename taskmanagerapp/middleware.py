@@ -0,0 +1,44 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    # Records latency, queries, cache hits and Celery publishes per URL name
+    # (see metrics.py). Listed first, so the timing covers the other
+    # middleware too. Streaming responses are timed until their headers.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics, token = metrics.start_request()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        metrics.finish_request(request, response, request_metrics, token, time.perf_counter() - start)
+        if metrics.flush_due():
+            metrics.flush()
+        return response
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        metrics.finish_request(request, response, request_metrics, token, time.perf_counter() - start)
+        if metrics.flush_due():
+            await sync_to_async(metrics.flush)()
+        return response
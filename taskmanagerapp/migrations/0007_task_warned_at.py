@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0006_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_open_deadline_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='warned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('warned_at__isnull', True), models.Q(('status', 'Done'), _negated=True)), fields=['deadline'], name='task_unwarned_deadline_idx'),
+        ),
+    ]
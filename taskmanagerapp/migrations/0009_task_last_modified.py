@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0008_queuedemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='last_modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+import re
+from collections import Counter
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# GIN indexes need PostgreSQL, so they are created outside the model state.
+# The search vector index serves full-text and prefix queries, the trigram
+# index typo-tolerant title matching.
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS task_search_vector_idx '
+        'ON taskmanagerapp_task USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS task_title_trgm_idx '
+        'ON taskmanagerapp_task USING gin (title gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS task_title_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS task_search_vector_idx')
+
+
+def index_existing_tasks(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE taskmanagerapp_task SET search_vector = "
+            "setweight(to_tsvector(%s, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector(%s, coalesce(description, '')), 'B')",
+            [settings.TASK_SEARCH_CONFIG, settings.TASK_SEARCH_CONFIG]
+        )
+        return
+
+    Task = apps.get_model('taskmanagerapp', 'Task')
+    TaskSearchToken = apps.get_model('taskmanagerapp', 'TaskSearchToken')
+    tokens = []
+    for pk, title, description in Task.objects.values_list('pk', 'title', 'description').iterator():
+        weights = Counter()
+        for token in re.findall(r'\w+', title.lower()):
+            weights[token[:64]] += 2
+        for token in re.findall(r'\w+', description.lower()):
+            weights[token[:64]] += 1
+        tokens.extend(
+            TaskSearchToken(task_id=pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+    TaskSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0009_task_last_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasksearchtoken',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='taskmanagerapp.task'),
+        ),
+        migrations.AddIndex(
+            model_name='tasksearchtoken',
+            index=models.Index(fields=['token', 'task'], name='task_search_token_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(index_existing_tasks, migrations.RunPython.noop),
+    ]
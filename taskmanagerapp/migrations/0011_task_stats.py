@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_tasks(apps, schema_editor):
+    Task = apps.get_model('taskmanagerapp', 'Task')
+    TaskStat = apps.get_model('taskmanagerapp', 'TaskStat')
+    rows = Task.objects.values('assignee_id', 'status', 'priority').annotate(count=Count('id')).order_by()
+    TaskStat.objects.bulk_create([TaskStat(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0010_task_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDeadlineStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overdue', models.IntegerField(default=0)),
+                ('due_soon', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('assignee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='task_deadline_stat', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('To Do', 'To Do'), ('In Progress', 'In Progress'), ('In Review', 'In Review'), ('Done', 'Done')], max_length=20)),
+                ('priority', models.CharField(choices=[('Low', 'Low'), ('Medium', 'Medium'), ('High', 'High'), ('Very High', 'Very High')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskstat',
+            constraint=models.UniqueConstraint(fields=('assignee', 'status', 'priority'), name='task_stat_unique_key'),
+        ),
+        migrations.RunPython(count_existing_tasks, migrations.RunPython.noop),
+    ]
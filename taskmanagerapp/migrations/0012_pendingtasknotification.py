@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0011_task_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingTaskNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated_by', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_notification', to='taskmanagerapp.task')),
+            ],
+        ),
+    ]
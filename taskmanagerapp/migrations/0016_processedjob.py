@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0015_archivedtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def mark_warned_tasks(apps, schema_editor):
+    # Before warned_at, warnings were queued with an ETA when a task was
+    # saved, so open tasks already inside the window have had theirs and
+    # must not be warned again by the first beat run.
+    Task = apps.get_model('taskmanagerapp', 'Task')
+    now = timezone.now()
+    (
+        Task.objects
+        .filter(warned_at__isnull=True, deadline__lte=now + settings.DEADLINE_WARNING_WINDOW)
+        .exclude(status='Done')
+        .update(warned_at=now)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmanagerapp', '0016_processedjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_warned_tasks, migrations.RunPython.noop),
+    ]
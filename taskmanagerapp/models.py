@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Task(models.Model):
@@ -24,3 +27,129 @@ class Task(models.Model):
     startDate = models.DateTimeField(default=datetime.date.today)
     deadline = models.DateTimeField(default=datetime.date.today)
     priority = models.CharField(max_length=20, choices=Priority, default=Priority.HIGH)  # Priority enum
+    warned_at = models.DateTimeField(null=True, blank=True)  # When the deadline warning was sent
+    last_modified = models.DateTimeField(auto_now=True)  # Validator for conditional GETs
+    search_vector = SearchVectorField(null=True, editable=False)  # Full-text search (PostgreSQL)
+
+    class Meta:
+        indexes = [
+            # Per-assignee listings, which default to deadline order
+            models.Index(fields=['assignee', 'deadline'], name='task_assignee_deadline_idx'),
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+            # The deadline-warning scan only looks at unfinished, unwarned tasks
+            models.Index(
+                fields=['deadline'],
+                condition=Q(warned_at__isnull=True) & ~Q(status='Done'),
+                name='task_unwarned_deadline_idx'
+            ),
+            # The archiving scan only looks at finished tasks
+            models.Index(
+                fields=['last_modified'],
+                condition=Q(status='Done'),
+                name='task_done_modified_idx'
+            ),
+        ]
+
+
+class QueuedEmail(models.Model):
+    subject = models.CharField(max_length=500)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class TaskSearchToken(models.Model):
+    # Inverted index used for search when the database is not PostgreSQL
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'task'], name='task_search_token_idx'),
+        ]
+
+
+class TaskStat(models.Model):
+    # Task count per (assignee, status, priority), kept up to date on writes
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_stats')
+    status = models.CharField(max_length=20, choices=Task.Status)
+    priority = models.CharField(max_length=20, choices=Task.Priority)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['assignee', 'status', 'priority'], name='task_stat_unique_key'),
+        ]
+
+
+class TaskDeadlineStat(models.Model):
+    # Overdue and due-soon totals per assignee, refreshed by a periodic job
+    assignee = models.OneToOneField(User, on_delete=models.CASCADE, related_name='task_deadline_stat')
+    overdue = models.IntegerField(default=0)
+    due_soon = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+
+class PendingTaskNotification(models.Model):
+    # Update notification waiting for further edits of the same task
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='pending_notification')
+    updated_by = models.JSONField(default=list)  # Usernames, in edit order
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class NotificationSubscription(models.Model):
+    # Limits a superuser's update notifications to matching tasks. Superusers
+    # without subscriptions get every notification.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_subscriptions',
+        limit_choices_to={'is_superuser': True}
+    )
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')  # Any assignee if empty
+    priority = models.CharField(max_length=20, choices=Task.Priority, blank=True)  # Any priority if empty
+
+
+class OutboxMessage(models.Model):
+    # Celery job written in the same transaction as the change it is about,
+    # published by the outbox relay
+    task_name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    dedup_key = models.CharField(max_length=200, unique=True)  # Also the Celery task id
+    available_at = models.DateTimeField()  # Not published before
+    published_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_at', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+
+class ProcessedJob(models.Model):
+    # Id of an outbox job that ran, so a job published twice runs once
+    key = models.CharField(max_length=200, unique=True)
+    processed_at = models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedTask(models.Model):
+    # Done task moved out of Task by the archiving job (see archive.py). Keeps
+    # the id it had, so it never collides with an active task.
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=250)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Task.Status, default=Task.Status.DONE)
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    startDate = models.DateTimeField()
+    deadline = models.DateTimeField()
+    priority = models.CharField(max_length=20, choices=Task.Priority)
+    last_modified = models.DateTimeField()  # Of the task, when it was archived
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignee', 'deadline'], name='archived_assignee_deadline_idx'),
+        ]
@@ -0,0 +1,115 @@
+import functools
+import logging
+import uuid
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import OutboxMessage, ProcessedJob
+
+
+# Transactional outbox for Celery jobs. Jobs are written to OutboxMessage in
+# the caller's transaction, so they exist exactly when the change commits and
+# requests never wait on the broker. The relay (manage.py relay_outbox)
+# publishes them in batches. Delivery is at least once: a relay that dies
+# between publishing a batch and marking it published sends it again. The
+# dedup key is the Celery task id, and jobs decorated with idempotent() record
+# it in ProcessedJob in the transaction of their work, so a job delivered
+# twice only runs once.
+
+logger = logging.getLogger(__name__)
+
+
+# Helper Functions
+def enqueue(task, *args, dedup_key=None, countdown=0, **kwargs):
+    # A job with the dedup key of an existing message is dropped. Returns
+    # whether the job was written.
+    message = OutboxMessage(
+        task_name=task.name,
+        args=list(args),
+        kwargs=kwargs,
+        dedup_key=dedup_key or uuid.uuid4().hex,
+        available_at=timezone.now() + timedelta(seconds=countdown)
+    )
+    if dedup_key is None:
+        message.save()
+    else:
+        try:
+            # A savepoint, so a duplicate leaves the caller's transaction usable
+            with transaction.atomic():
+                message.save()
+        except IntegrityError:
+            return False
+    metrics.count('outbox_messages_total')
+    return True
+
+
+def idempotent(func):
+    # For Celery tasks (bind=True) published through the outbox. The job runs
+    # in a transaction with the ProcessedJob row of its task id, which waits
+    # for and then fails on a concurrent or earlier run of the same job.
+    # Direct calls (no task id) always run.
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        job_id = self.request.id
+        if job_id is None:
+            return func(self, *args, **kwargs)
+        try:
+            with transaction.atomic():
+                ProcessedJob.objects.create(key=job_id)
+                return func(self, *args, **kwargs)
+        except IntegrityError:
+            if ProcessedJob.objects.filter(key=job_id).exists():
+                logger.info('Skipped job %s %s, it already ran', self.name, job_id)
+                return 'Duplicate'
+            raise
+    return wrapper
+
+
+def publish(message):
+    current_app.tasks[message.task_name].apply_async(
+        message.args,
+        message.kwargs,
+        task_id=message.dedup_key
+    )
+
+
+def relay_batch(batch_size):
+    # Rows stay locked until the batch is published, so concurrent relays
+    # skip them and a failed publish leaves them for the next run
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True, available_at__lte=timezone.now())
+            .order_by('id')[:batch_size]
+        )
+        for message in messages:
+            publish(message)
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).update(published_at=timezone.now())
+    return len(messages)
+
+
+def relay(batch_size=None):
+    if batch_size is None:
+        batch_size = settings.OUTBOX_RELAY_BATCH_SIZE
+
+    published = 0
+    while True:
+        count = relay_batch(batch_size)
+        published += count
+        if count < batch_size:
+            break
+    return published
+
+
+def purge():
+    # Periodic, see the purge_outbox task. Published messages and processed
+    # job ids are kept for a while to drop duplicates.
+    cutoff = timezone.now() - settings.OUTBOX_RETENTION
+    OutboxMessage.objects.filter(published_at__lt=cutoff).delete()
+    ProcessedJob.objects.filter(processed_at__lt=cutoff).delete()
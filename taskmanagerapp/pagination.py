@@ -0,0 +1,116 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .serializers import TASK_ROW_FIELDS, task_rows
+
+
+# Keyset (cursor) pagination for task listings. Pages are walked in
+# (sort field, id) order, so memory per request stays flat. Full listings are
+# streamed by export.py.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+DATETIME_FIELDS = ['startDate', 'deadline']
+
+
+# Helper Functions
+def get_sort_value(row, sort_by):
+    field = 'assignee_id' if sort_by == 'assignee' else sort_by
+    value = row[TASK_ROW_FIELDS.index(field)]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def has_type(value, value_type):
+    # bool is an int subclass, but never a valid id
+    return isinstance(value, value_type) and not isinstance(value, bool)
+
+
+def encode_cursor(row, sort_by, order):
+    payload = json.dumps([sort_by, order, get_sort_value(row, sort_by), row[0]])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, sort_by, order):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        cursor_sort, cursor_order, value, pk = payload
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.')
+
+    if cursor_sort != sort_by or cursor_order != order:
+        raise ValueError('Cursor does not match the requested sort order.')
+
+    # A tampered cursor must not reach the query as a list or an object
+    value_type = int if sort_by == 'assignee' else str
+    if not has_type(pk, int) or not has_type(value, value_type):
+        raise ValueError('Invalid cursor.')
+    if sort_by in DATETIME_FIELDS:
+        try:
+            value = parse_datetime(value)
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValueError('Invalid cursor.')
+    return value, pk
+
+
+def parse_page_size(page_size):
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer.')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def filter_after_cursor(tasks, sort_by, order, cursor):
+    if not cursor:
+        return tasks
+    value, pk = decode_cursor(cursor, sort_by, order)
+    lookup = 'lt' if order == 'desc' else 'gt'
+    return tasks.filter(
+        Q(**{f'{sort_by}__{lookup}': value}) |
+        Q(**{sort_by: value, f'pk__{lookup}': pk})
+    )
+
+
+def split_page(page, sort_by, order, page_size):
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(page[-1], sort_by, order)
+    return page, next_cursor
+
+
+def combine(tasks, archived, sort_by, order):
+    # task_rows() of active and archived tasks in one (sort_by, id) order.
+    # Archived tasks keep their ids, so id still breaks ties.
+    field = 'assignee_id' if sort_by == 'assignee' else sort_by
+    ordering = [f'-{field}', '-id'] if order == 'desc' else [field, 'id']
+    return task_rows(tasks.order_by()).union(task_rows(archived.order_by()), all=True).order_by(*ordering)
+
+
+# Pagination
+def paginate(tasks, sort_by, order, cursor=None, page_size=DEFAULT_PAGE_SIZE, archived=None):
+    # tasks must already be ordered by (sort_by, id) in the given direction.
+    # Returns the page as task_rows() tuples and the cursor of the next page.
+    # Archived tasks, if given, are merged into the same order.
+    tasks = filter_after_cursor(tasks, sort_by, order, cursor)
+    if archived is None:
+        rows = task_rows(tasks)
+    else:
+        rows = combine(tasks, filter_after_cursor(archived, sort_by, order, cursor), sort_by, order)
+    page = list(rows[:page_size + 1])
+    return split_page(page, sort_by, order, page_size)
+
+
+async def apaginate(tasks, sort_by, order, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    tasks = filter_after_cursor(tasks, sort_by, order, cursor)
+    page = [row async for row in task_rows(tasks)[:page_size + 1]]
+    return split_page(page, sort_by, order, page_size)
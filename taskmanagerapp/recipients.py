@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import NotificationSubscription
+
+
+# Recipients of superuser notifications. The list of superusers and their
+# subscriptions is built once and cached until a User or subscription changes
+# (see signals.py), instead of querying users for every notification.
+
+CACHE_KEY = 'notification-recipients:superusers'
+# User fields the list depends on, other user changes keep the cache
+USER_FIELDS = ['is_superuser', 'email']
+
+
+# Helper Functions
+def build_recipients():
+    subscriptions = {}
+    for user_id, assignee_id, priority in NotificationSubscription.objects.values_list('user_id', 'assignee_id', 'priority'):
+        subscriptions.setdefault(user_id, []).append((assignee_id, priority))
+
+    superusers = get_user_model().objects.filter(is_superuser=True).exclude(email='').values_list('pk', 'email')
+    return [
+        {'email': email, 'subscriptions': subscriptions.get(pk, [])}
+        for pk, email in superusers
+    ]
+
+
+def get_recipients():
+    recipients = cache.get(CACHE_KEY)
+    if recipients is None:
+        recipients = build_recipients()
+        cache.set(CACHE_KEY, recipients, timeout=settings.NOTIFICATION_RECIPIENTS_CACHE_TIMEOUT)
+    return recipients
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def matches(subscription, assignee_id, priority):
+    # A task attribute that is not known matches every subscription
+    subscribed_assignee, subscribed_priority = subscription
+    return (
+        (subscribed_assignee is None or assignee_id is None or subscribed_assignee == assignee_id) and
+        (not subscribed_priority or priority is None or subscribed_priority == priority)
+    )
+
+
+def superuser_emails(assignee_id=None, priority=None):
+    return [
+        recipient['email'] for recipient in get_recipients()
+        if not recipient['subscriptions'] or any(
+            matches(subscription, assignee_id, priority)
+            for subscription in recipient['subscriptions']
+        )
+    ]
@@ -0,0 +1,97 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+
+from .models import Task, TaskSearchToken
+
+
+# Task search. On PostgreSQL, tasks carry a weighted tsvector (GIN indexed)
+# matched with prefix queries, plus trigram matching on titles for typos. Other
+# databases use the TaskSearchToken inverted index instead.
+
+SEARCH_FIELDS = {'title', 'description'}
+
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+MAX_TERMS = 10
+
+
+# Helper Functions
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return [token[:64] for token in re.findall(r'\w+', (text or '').lower())]
+
+
+def get_terms(q):
+    return tokenize(q)[:MAX_TERMS]
+
+
+def prefix_range(term):
+    # Index-friendly startswith on every database
+    return Q(token__gte=term, token__lt=term + '\uffff')
+
+
+# Indexing
+def index_tasks(task_ids):
+    if is_postgresql():
+        Task.objects.filter(pk__in=task_ids).update(
+            search_vector=(
+                SearchVector('title', weight='A', config=settings.TASK_SEARCH_CONFIG) +
+                SearchVector('description', weight='B', config=settings.TASK_SEARCH_CONFIG)
+            )
+        )
+        return
+
+    TaskSearchToken.objects.filter(task_id__in=task_ids).delete()
+    tokens = []
+    for pk, title, description in Task.objects.filter(pk__in=task_ids).values_list('pk', 'title', 'description'):
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            weights[token] += DESCRIPTION_WEIGHT
+        tokens.extend(
+            TaskSearchToken(task_id=pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        )
+    TaskSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+# Queries
+def search_tasks(tasks, q):
+    # Filters tasks to matches for q, annotated with rank and ordered by it.
+    # Every term has to match, the last one as a prefix.
+    terms = get_terms(q)
+    if not terms:
+        return tasks.none()
+
+    if is_postgresql():
+        raw_query = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        query = SearchQuery(raw_query, search_type='raw', config=settings.TASK_SEARCH_CONFIG)
+        return tasks.filter(
+            Q(search_vector=query) | Q(TrigramSimilar(F('title'), q))
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('title', q)
+        ).order_by('-rank', 'id')
+
+    condition = Q()
+    for index, term in enumerate(terms):
+        lookup = prefix_range(term) if index == len(terms) - 1 else Q(token=term)
+        condition |= lookup
+        tasks = tasks.filter(pk__in=TaskSearchToken.objects.filter(lookup).values('task_id'))
+
+    rank = (
+        TaskSearchToken.objects.filter(condition, task=OuterRef('pk'))
+        .values('task')
+        .annotate(total=Sum('weight'))
+        .values('total')
+    )
+    return tasks.annotate(rank=Subquery(rank)).order_by('-rank', 'id')
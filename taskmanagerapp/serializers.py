@@ -1,12 +1,17 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Task
 
 
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DATETIME_INPUT_FORMATS = ["%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]
+
+
 class TaskSerializer(serializers.ModelSerializer):
 
     assignee_username = serializers.SerializerMethodField()
-    startDate = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", input_formats=["%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"])
-    deadline = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", input_formats=["%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"])
+    startDate = serializers.DateTimeField(format=DATETIME_FORMAT, input_formats=DATETIME_INPUT_FORMATS)
+    deadline = serializers.DateTimeField(format=DATETIME_FORMAT, input_formats=DATETIME_INPUT_FORMATS)
 
     class Meta:
         model = Task
@@ -24,3 +29,68 @@ class TaskSerializer(serializers.ModelSerializer):
 
     def get_assignee_username(self, obj):
         return obj.assignee.username if obj.assignee else 'N/A'  # Get the username directly
+
+
+class TaskImportSerializer(TaskSerializer):
+    # Imported rows name their assignee by username, resolved through the
+    # context['assignees'] dict (username: id) instead of a query per row,
+    # and may use any ISO 8601 datetime
+    assignee = serializers.CharField()
+    startDate = serializers.DateTimeField(required=False, input_formats=DATETIME_INPUT_FORMATS + ['iso-8601'])
+    deadline = serializers.DateTimeField(required=False, input_formats=DATETIME_INPUT_FORMATS + ['iso-8601'])
+
+    class Meta(TaskSerializer.Meta):
+        fields = [
+            'title',
+            'description',
+            'assignee',
+            'status',
+            'startDate',
+            'deadline',
+            'priority'
+        ]
+
+    def validate_assignee(self, value):
+        try:
+            return self.context['assignees'][value]
+        except KeyError:
+            raise serializers.ValidationError(f'Unknown user "{value}".')
+
+
+# Read-only fast path for listings. Rows come straight from values_list() and
+# are formatted in one pass, producing the same output as TaskSerializer.
+TASK_ROW_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'assignee_id',
+    'assignee__username',
+    'status',
+    'startDate',
+    'deadline',
+    'priority'
+]
+
+
+def task_rows(tasks):
+    return tasks.values_list(*TASK_ROW_FIELDS)
+
+
+def serialize_task_row(row, tz):
+    pk, title, description, assignee_id, assignee_username, task_status, start_date, deadline, priority = row
+    return {
+        'id': pk,
+        'title': title,
+        'description': description,
+        'assignee': assignee_id,
+        'assignee_username': assignee_username if assignee_id else 'N/A',
+        'status': task_status,
+        'startDate': start_date.astimezone(tz).strftime(DATETIME_FORMAT),
+        'deadline': deadline.astimezone(tz).strftime(DATETIME_FORMAT),
+        'priority': priority
+    }
+
+
+def serialize_task_rows(rows):
+    tz = timezone.get_current_timezone()
+    return [serialize_task_row(row, tz) for row in rows]
@@ -0,0 +1,420 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.shortcuts import get_object_or_404
+
+from rest_framework.exceptions import ValidationError
+
+from . import cache, events, outbox, pagination, search, stats
+from .models import ArchivedTask, PendingTaskNotification, Task
+from .serializers import TaskSerializer, serialize_task_rows, task_rows
+from .tasks import send_task_email_to_assignee_created, send_task_email_to_assignee_updated, send_bulk_task_notifications, send_coalesced_update_notifications
+
+
+# Task service shared by the HTML views and the REST API, so that both run the
+# same permission and notification rules in-process. Notification jobs go to
+# the outbox in the transaction of the change (see outbox.py).
+
+SORT_FIELDS = [
+    'title',
+    'assignee',
+    'status',
+    'startDate',
+    'deadline',
+    'priority'
+]
+
+BULK_BATCH_SIZE = 500
+
+TASK_LIST_FIELDS = [
+    'title',
+    'description',
+    'status',
+    'startDate',
+    'deadline',
+    'priority',
+    'assignee__id',
+    'assignee__username'
+]
+
+
+# Helper Functions
+def check_superuser(user):
+    if not user.is_superuser:
+        raise PermissionError('Permission denied.')
+
+
+def is_task_id(pk):
+    # Ids of bulk items, bool is an int subclass
+    return isinstance(pk, int) and not isinstance(pk, bool)
+
+
+def notify_assignee_email(task, start_date_aware, deadline_aware, is_update=False):
+    if is_update:
+        outbox.enqueue(
+            send_task_email_to_assignee_updated,
+            task.assignee.email,
+            task.assignee.username,
+            task.title
+        )
+    else:
+        outbox.enqueue(
+            send_task_email_to_assignee_created,
+            task.assignee.email,
+            task.assignee.username,
+            task.title,
+            start_date_aware,
+            deadline_aware,
+            dedup_key=f'task-created:{task.pk}'
+        )
+
+
+def queue_update_notifications(task_ids, updated_by):
+    # Edits are coalesced per task: the first edit records a pending row and
+    # schedules send_coalesced_update_notifications after the window, later
+    # edits in the window only add their author to the row
+    with transaction.atomic():
+        pending = {
+            item.task_id: item
+            for item in PendingTaskNotification.objects.select_for_update().filter(task_id__in=task_ids)
+        }
+        changed = []
+        for item in pending.values():
+            if updated_by not in item.updated_by:
+                item.updated_by.append(updated_by)
+                changed.append(item)
+        PendingTaskNotification.objects.bulk_update(changed, ['updated_by'])
+
+        new_ids = [pk for pk in dict.fromkeys(task_ids) if pk not in pending]
+        PendingTaskNotification.objects.bulk_create(
+            [PendingTaskNotification(task_id=pk, updated_by=[updated_by]) for pk in new_ids],
+            ignore_conflicts=True
+        )
+
+        if new_ids:
+            outbox.enqueue(
+                send_coalesced_update_notifications,
+                new_ids,
+                countdown=settings.TASK_UPDATE_NOTIFICATION_WINDOW
+            )
+
+
+def queue_created_notifications(task_ids):
+    # One job for a whole batch of created tasks
+    if task_ids:
+        outbox.enqueue(send_bulk_task_notifications, list(task_ids))
+
+
+def notify_task_updated(task, updated_by):
+    queue_update_notifications([task.pk], updated_by.username)
+
+
+def save_task(serializer):
+    # A moved deadline has to be warned about again by send_deadline_warnings
+    extra = {}
+    deadline = serializer.validated_data.get('deadline')
+    if serializer.instance is not None and deadline is not None and deadline != serializer.instance.deadline:
+        extra['warned_at'] = None
+    return serializer.save(**extra)
+
+
+# Queries
+def task_queryset():
+    # Join the assignee and load only the user columns listings need
+    return Task.objects.select_related('assignee').only(*TASK_LIST_FIELDS)
+
+
+def normalize_sort(sort_by, order):
+    if sort_by not in SORT_FIELDS:
+        sort_by = 'deadline'
+    if order != 'desc':
+        order = 'asc'
+    return sort_by, order
+
+
+def filter_scope(tasks, user, assignee_id=None):
+    if user.is_superuser and not assignee_id:
+        return tasks
+    if assignee_id:
+        return tasks.filter(assignee=assignee_id)
+    return tasks.filter(assignee=user.id)
+
+
+def list_tasks(user, assignee_id=None, sort_by='deadline', order='asc'):
+    return order_tasks(filter_scope(task_queryset(), user, assignee_id), sort_by, order)
+
+
+def list_archived_tasks(user, assignee_id=None, sort_by='deadline', order='asc'):
+    return order_tasks(filter_scope(ArchivedTask.objects.all(), user, assignee_id), sort_by, order)
+
+
+def list_task_rows(user, assignee_id=None, sort_by='deadline', order='asc', include_archived=False):
+    # task_rows() of a whole listing, with the archived tasks if asked
+    tasks = list_tasks(user, assignee_id, sort_by, order)
+    if not include_archived:
+        return task_rows(tasks)
+    archived = list_archived_tasks(user, assignee_id, sort_by, order)
+    return pagination.combine(tasks, archived, *normalize_sort(sort_by, order))
+
+
+def order_tasks(tasks, sort_by='deadline', order='asc'):
+    # id breaks ties so that the order is stable for cursor pagination
+    sort_by, order = normalize_sort(sort_by, order)
+    if order == 'desc':
+        return tasks.order_by(f'-{sort_by}', '-id')
+    return tasks.order_by(sort_by, 'id')
+
+
+def get_list_scope(user, assignee_id=None):
+    if user.is_superuser and not assignee_id:
+        return cache.ALL_SCOPE
+    return assignee_id or user.id
+
+
+def get_list_version(user, assignee_id=None):
+    # (generation, last modified timestamp) of a listing, without querying it
+    scope = get_list_scope(user, assignee_id)
+
+    def fallback():
+        tasks = Task.objects.all()
+        if scope != cache.ALL_SCOPE:
+            tasks = tasks.filter(assignee=scope)
+        last_modified = tasks.aggregate(last_modified=Max('last_modified'))['last_modified']
+        return last_modified.timestamp() if last_modified else None
+
+    return cache.get_generation(scope), cache.get_last_modified(scope, fallback)
+
+
+def get_task_list_data(user, assignee_id=None, sort_by='deadline', order='asc', cursor=None, page_size=None, include_archived=False):
+    # Serialized (results, next cursor) for a listing, served from the cache.
+    # Archiving bumps the generation like a delete, so entries with the
+    # archived tasks stay valid until then.
+    sort_by, order = normalize_sort(sort_by, order)
+
+    def build():
+        if page_size is None:
+            return serialize_task_rows(list_task_rows(user, assignee_id, sort_by, order, include_archived)), None
+        tasks = list_tasks(user, assignee_id, sort_by, order)
+        archived = list_archived_tasks(user, assignee_id, sort_by, order) if include_archived else None
+        page, next_cursor = pagination.paginate(tasks, sort_by, order, cursor, page_size, archived)
+        return serialize_task_rows(page), next_cursor
+
+    page = (cursor, page_size, 'archived') if include_archived else (cursor, page_size)
+    return cache.get_or_set(
+        get_list_scope(user, assignee_id),
+        sort_by,
+        order,
+        page,
+        build
+    )
+
+
+def search_task_list_data(user, assignee_id=None, q='', limit=pagination.DEFAULT_PAGE_SIZE):
+    # Serialized search results for a listing, best match first
+    def build():
+        tasks = search.search_tasks(list_tasks(user, assignee_id), q)
+        return serialize_task_rows(task_rows(tasks)[:limit])
+
+    return cache.get_or_set(
+        get_list_scope(user, assignee_id),
+        'search',
+        'rank',
+        (q, limit),
+        build
+    )
+
+
+async def aget_task_list_data(user, assignee_id=None, sort_by='deadline', order='asc', cursor=None, page_size=None):
+    # Async ORM version of get_task_list_data, sharing its cache entries
+    sort_by, order = normalize_sort(sort_by, order)
+
+    async def build():
+        tasks = list_tasks(user, assignee_id, sort_by, order)
+        if page_size is None:
+            # values_list() querysets cannot aiterator() on Django 5.2, and the
+            # whole list is serialized anyway
+            rows = [row async for row in task_rows(tasks)]
+            return serialize_task_rows(rows), None
+        page, next_cursor = await pagination.apaginate(tasks, sort_by, order, cursor, page_size)
+        return serialize_task_rows(page), next_cursor
+
+    return await cache.aget_or_set(
+        get_list_scope(user, assignee_id),
+        sort_by,
+        order,
+        (cursor, page_size),
+        build
+    )
+
+
+# Commands
+def create_task(user, data):
+    check_superuser(user)
+
+    serializer = TaskSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        task = save_task(serializer)
+
+        notify_assignee_email(
+            task,
+            task.startDate,
+            task.deadline
+        )
+    return task, serializer
+
+
+def replace_task(user, task, data):
+    serializer = TaskSerializer(task, data=data, partial=False)
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        save_task(serializer)
+
+        start_date_str = data['startDate']
+        deadline_str = data['deadline']
+
+        notify_assignee_email(
+            task,
+            start_date_str,
+            deadline_str,
+            is_update=True
+        )
+    return task, serializer
+
+
+def update_task(user, task, data):
+    if not user.is_superuser and task.assignee_id != user.id:
+        raise PermissionError('Permission denied.')
+
+    serializer = TaskSerializer(task, data=data, partial=True)
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        save_task(serializer)
+
+        if data.get('deadline'):
+            notify_task_updated(task, user)
+    return task, serializer
+
+
+def delete_task(user, task_id):
+    check_superuser(user)
+    task = get_object_or_404(Task, pk=task_id)
+    task.delete()
+
+
+# Bulk commands. Items are validated one by one so that invalid items are
+# reported by index without aborting the rest of the batch.
+def bulk_create_tasks(user, items):
+    check_superuser(user)
+
+    serializer = TaskSerializer(many=True)
+    tasks = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            tasks.append(Task(**serializer.child.run_validation(item)))
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+
+    return insert_tasks(tasks), errors
+
+
+def insert_tasks(tasks, notify=True, publish=True):
+    # Inserts validated, unsaved tasks with everything post_save would do.
+    # Imports skip the notifications or queue them later, and skip the live
+    # events, which would carry every imported row.
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create(tasks, batch_size=BULK_BATCH_SIZE)
+        created_ids = [task.pk for task in tasks]
+        search.index_tasks(created_ids)
+        stats.adjust(Counter(stats.stat_key(task) for task in tasks))
+        if notify:
+            queue_created_notifications(created_ids)
+
+    # bulk_create does not send post_save
+    cache.invalidate([task.assignee_id for task in tasks])
+    if publish:
+        transaction.on_commit(lambda: events.publish_saved(created_ids))
+    return tasks
+
+
+def bulk_update_tasks(user, items):
+    check_superuser(user)
+
+    ids = [item.get('id') for item in items if isinstance(item, dict)]
+    existing = Task.objects.select_related('assignee').in_bulk(
+        [pk for pk in ids if is_task_id(pk)]
+    )
+
+    tasks = []
+    fields = set()
+    notify_ids = []
+    assignee_ids = []
+    previous_assignees = {}
+    stat_deltas = Counter()
+    errors = []
+    for index, item in enumerate(items):
+        task = existing.get(item.get('id')) if isinstance(item, dict) else None
+        if task is None:
+            errors.append({'index': index, 'errors': {'id': ['Task not found.']}})
+            continue
+
+        serializer = TaskSerializer(task, data=item, partial=True)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+
+        assignee_ids.append(task.assignee_id)
+        previous_assignees[task.pk] = task.assignee_id
+        stat_deltas[stats.stat_key(task)] -= 1
+        validated_data = dict(serializer.validated_data)
+        if 'deadline' in validated_data and validated_data['deadline'] != task.deadline:
+            validated_data['warned_at'] = None
+        # bulk_update does not apply auto_now
+        validated_data['last_modified'] = timezone.now()
+        for attr, value in validated_data.items():
+            setattr(task, attr, value)
+        fields.update(validated_data)
+        tasks.append(task)
+        assignee_ids.append(task.assignee_id)
+        stat_deltas[stats.stat_key(task)] += 1
+        if item.get('deadline'):
+            notify_ids.append(task.pk)
+
+    if tasks and fields:
+        with transaction.atomic():
+            Task.objects.bulk_update(tasks, sorted(fields), batch_size=BULK_BATCH_SIZE)
+            if search.SEARCH_FIELDS & fields:
+                search.index_tasks([task.pk for task in tasks])
+            stats.adjust(stat_deltas)
+            if notify_ids:
+                queue_update_notifications(notify_ids, user.username)
+
+        # bulk_update does not send post_save
+        cache.invalidate(assignee_ids)
+        transaction.on_commit(
+            lambda: events.publish_saved(list(previous_assignees), previous_assignees)
+        )
+    return tasks, errors
+
+
+def bulk_delete_tasks(user, ids):
+    check_superuser(user)
+
+    # QuerySet.delete sends post_delete, which invalidates the cache and
+    # publishes the events
+    with transaction.atomic():
+        tasks = Task.objects.filter(pk__in=[pk for pk in ids if is_task_id(pk)])
+        deleted_ids = set(tasks.values_list('pk', flat=True))
+        tasks.delete()
+
+    errors = []
+    for index, pk in enumerate(ids):
+        if not is_task_id(pk):
+            errors.append({'index': index, 'errors': {'id': ['A valid integer is required.']}})
+        elif pk not in deleted_ids:
+            errors.append({'index': index, 'errors': {'id': ['Task not found.']}})
+    return deleted_ids, errors
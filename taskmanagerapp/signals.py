@@ -0,0 +1,139 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun, task_received, task_revoked
+
+from . import authentication, cache, events, metrics, recipients, search, stats
+from .models import NotificationSubscription, Task
+
+
+# Task list cache invalidation, search indexing, statistics and live update
+# events. The bulk paths in services.py do not send these signals and do all
+# of it themselves. User changes drop the cached JWT user snapshot and, with
+# subscription changes, the cached notification recipients. The receivers at
+# the end record request and Celery task metrics.
+
+@receiver(pre_save, sender=Task)
+def remember_previous_state(sender, instance, **kwargs):
+    # (assignee, status, priority) and (title, description) before the save,
+    # None for new tasks
+    instance._previous_stat_key = None
+    instance._previous_search_text = None
+    if instance.pk:
+        previous = (
+            Task.objects.filter(pk=instance.pk)
+            .values_list('assignee_id', 'status', 'priority', 'title', 'description')
+            .first()
+        )
+        if previous is not None:
+            instance._previous_stat_key = previous[:3]
+            instance._previous_search_text = previous[3:]
+
+
+@receiver(post_save, sender=Task)
+def invalidate_task_lists_on_save(sender, instance, update_fields=None, **kwargs):
+    previous_stat_key = getattr(instance, '_previous_stat_key', None)
+    previous_assignee_id = previous_stat_key[0] if previous_stat_key else None
+    cache.invalidate([instance.assignee_id, previous_assignee_id])
+
+    if previous_stat_key != stats.stat_key(instance):
+        stats.record_change(previous_stat_key, stats.stat_key(instance))
+
+    # Only title and description are indexed, a status change keeps the index
+    search_text = (instance.title, instance.description)
+    if update_fields is None or search.SEARCH_FIELDS & set(update_fields):
+        if getattr(instance, '_previous_search_text', None) != search_text:
+            search.index_tasks([instance.pk])
+
+    task_id = instance.pk
+    transaction.on_commit(
+        lambda: events.publish_saved([task_id], {task_id: previous_assignee_id})
+    )
+
+
+@receiver(post_delete, sender=Task)
+def invalidate_task_lists_on_delete(sender, instance, **kwargs):
+    cache.invalidate([instance.assignee_id])
+    stats.record_change(stats.stat_key(instance), None)
+
+    deleted = [(instance.pk, instance.assignee_id)]
+    transaction.on_commit(lambda: events.publish_deleted(deleted))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_recipient_fields(sender, instance, update_fields=None, **kwargs):
+    # Recipient fields before the save, skipped for saves that cannot change
+    # them, such as the last_login update on every login
+    instance._previous_recipient_fields = None
+    if instance.pk and (update_fields is None or set(update_fields) & set(recipients.USER_FIELDS)):
+        instance._previous_recipient_fields = (
+            User.objects.filter(pk=instance.pk).values_list(*recipients.USER_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def forget_recipients_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(recipients.USER_FIELDS):
+        return
+    current = tuple(getattr(instance, field) for field in recipients.USER_FIELDS)
+    if created or getattr(instance, '_previous_recipient_fields', None) != current:
+        recipients.invalidate()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=NotificationSubscription)
+@receiver(post_delete, sender=NotificationSubscription)
+def forget_notification_recipients(sender, instance, **kwargs):
+    recipients.invalidate()
+
+
+# Request and Celery task metrics
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.instrument(connection)
+
+
+@before_task_publish.connect
+def count_celery_publish(sender=None, headers=None, **kwargs):
+    metrics.count('celery_publishes_total')
+    if headers is not None:
+        metrics.mark_published(headers)
+
+
+@task_received.connect
+def record_task_received(sender=None, request=None, **kwargs):
+    metrics.receive_task(request.id, request.name, request.eta)
+    if metrics.flush_due():
+        metrics.flush()
+
+
+@task_revoked.connect
+def record_task_revoked(sender=None, request=None, **kwargs):
+    metrics.forget_task(request.id)
+
+
+@task_prerun.connect
+def record_task_start(sender=None, task_id=None, task=None, **kwargs):
+    metrics.start_task(task_id, task)
+
+
+@task_postrun.connect
+def record_task_finish(sender=None, task_id=None, task=None, state=None, **kwargs):
+    metrics.finish_task(task_id, task, state)
+    # Eager tasks run inside requests, which flush themselves
+    if not task.request.is_eager and metrics.flush_due():
+        metrics.flush()
+
+
+@task_failure.connect
+def record_task_failure(sender=None, exception=None, **kwargs):
+    metrics.record_task_failure(sender, exception)
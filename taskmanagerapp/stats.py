@@ -0,0 +1,154 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Task, TaskDeadlineStat, TaskStat
+
+
+# Task statistics served from summary tables. TaskStat counts are adjusted on
+# every task write (see signals.py and the bulk paths in services.py), so the
+# stats endpoint never scans tasks. Overdue and due-soon totals depend on the
+# clock and are refreshed by a periodic job; another job reconciles the
+# counts with the tasks table.
+
+DEADLINES_COMPUTED_KEY = 'task-stats:deadlines-computed-at'
+
+
+# Helper Functions
+def stat_key(task):
+    return task.assignee_id, task.status, task.priority
+
+
+def adjust(deltas):
+    # deltas maps stat keys to count changes
+    for (assignee_id, task_status, priority), delta in deltas.items():
+        if not delta:
+            continue
+        rows = TaskStat.objects.filter(assignee_id=assignee_id, status=task_status, priority=priority)
+        # A missing row for a decrement (e.g. while the assignee itself is
+        # being deleted) is left to reconcile_counts
+        if not rows.update(count=F('count') + delta) and delta > 0:
+            # First task with this key, a concurrent writer may have won
+            TaskStat.objects.bulk_create(
+                [TaskStat(assignee_id=assignee_id, status=task_status, priority=priority, count=0)],
+                ignore_conflicts=True
+            )
+            rows.update(count=F('count') + delta)
+
+
+def record_change(previous_key, key):
+    # previous_key is None for created tasks, key is None for deleted ones
+    deltas = Counter()
+    if previous_key is not None:
+        deltas[previous_key] -= 1
+    if key is not None:
+        deltas[key] += 1
+    adjust(deltas)
+
+
+# Periodic jobs
+def refresh_deadline_stats():
+    now = timezone.now()
+    open_tasks = Task.objects.exclude(status=Task.Status.DONE)
+    rows = open_tasks.filter(deadline__lte=now + settings.DEADLINE_WARNING_WINDOW).values('assignee_id').annotate(
+        overdue=Count('id', filter=Q(deadline__lt=now)),
+        due_soon=Count('id', filter=Q(deadline__gte=now))
+    ).order_by()
+
+    with transaction.atomic():
+        TaskDeadlineStat.objects.all().delete()
+        TaskDeadlineStat.objects.bulk_create([
+            TaskDeadlineStat(computed_at=now, **row) for row in rows
+        ], batch_size=1000)
+    cache.set(DEADLINES_COMPUTED_KEY, now, timeout=None)
+
+
+def count_tasks(tasks):
+    return {
+        (row['assignee_id'], row['status'], row['priority']): row['count']
+        for row in tasks.values('assignee_id', 'status', 'priority').annotate(count=Count('id')).order_by()
+    }
+
+
+def reconcile_assignee(assignee_id):
+    # Locks only this assignee's stat rows, then recounts their tasks. Writes
+    # adjust the stat rows after changing a task, so a write that already
+    # adjusted them commits before the recount and a later one adds its
+    # delta to the corrected count.
+    with transaction.atomic():
+        stats = {stat_key(stat): stat for stat in TaskStat.objects.select_for_update().filter(assignee_id=assignee_id)}
+        counts = count_tasks(Task.objects.filter(assignee_id=assignee_id))
+
+        changed = []
+        for key, stat in stats.items():
+            count = counts.get(key, 0)
+            if stat.count != count:
+                stat.count = count
+                changed.append(stat)
+        TaskStat.objects.bulk_update(changed, ['count'])
+        created = TaskStat.objects.bulk_create([
+            TaskStat(assignee_id=assignee_id, status=task_status, priority=priority, count=count)
+            for (_, task_status, priority), count in counts.items()
+            if (assignee_id, task_status, priority) not in stats
+        ], ignore_conflicts=True)
+        TaskStat.objects.filter(assignee_id=assignee_id, count=0).delete()
+    return len(changed) + len(created)
+
+
+def reconcile_counts():
+    # Correct drift in TaskStat. The full scan runs without locks and only
+    # finds the assignees whose counts differ. Each of them is then corrected
+    # in its own short transaction, so writes never wait for the scan.
+    counts = count_tasks(Task.objects.all())
+    stats = {
+        (row['assignee_id'], row['status'], row['priority']): row['count']
+        for row in TaskStat.objects.values('assignee_id', 'status', 'priority', 'count')
+    }
+    drifted = {
+        key[0] for key in counts.keys() | stats.keys()
+        if counts.get(key, 0) != stats.get(key, 0)
+    }
+    return sum(reconcile_assignee(assignee_id) for assignee_id in sorted(drifted))
+
+
+# Queries
+def get_stats(assignee_id=None):
+    stats = TaskStat.objects.filter(count__gt=0).select_related('assignee').order_by('assignee_id', 'status', 'priority')
+    deadline_stats = TaskDeadlineStat.objects.all()
+    if assignee_id is not None:
+        stats = stats.filter(assignee_id=assignee_id)
+        deadline_stats = deadline_stats.filter(assignee_id=assignee_id)
+
+    counts = []
+    by_status = Counter()
+    by_priority = Counter()
+    for stat in stats:
+        counts.append({
+            'assignee': stat.assignee_id,
+            'assignee_username': stat.assignee.username,
+            'status': stat.status,
+            'priority': stat.priority,
+            'count': stat.count
+        })
+        by_status[stat.status] += stat.count
+        by_priority[stat.priority] += stat.count
+
+    overdue = 0
+    due_soon = 0
+    for deadline_stat in deadline_stats:
+        overdue += deadline_stat.overdue
+        due_soon += deadline_stat.due_soon
+
+    return {
+        'total': sum(by_status.values()),
+        'by_status': dict(by_status),
+        'by_priority': dict(by_priority),
+        'counts': counts,
+        'overdue': overdue,
+        'due_soon': due_soon,
+        'deadlines_computed_at': cache.get(DEADLINES_COMPUTED_KEY)
+    }
@@ -1,13 +1,17 @@
 # tasks.py
 
 from celery import shared_task
-from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, mail, outbox, recipients, stats
+from .models import PendingTaskNotification, Task
 
 
 @shared_task(bind=True)
+@outbox.idempotent
 def send_task_email_to_assignee_created(self, assignee_email, assignee_name, task_title, task_startdate, task_deadline):
 
     tasklist_url = settings.DOMAIN_NAME + reverse('tasklist')
@@ -18,16 +22,17 @@ def send_task_email_to_assignee_created(self, assignee_email, assignee_name, tas
         f'The task with the title {task_title} has been created. It starts on the date {task_startdate} and the deadline is on the {task_deadline}. \n\n'
         f'For further questions, please refer to the URL: {tasklist_url}'
     )
-    send_mail(
+    mail.queue_mail(
         subject=mail_subject,
         message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[assignee_email],
+        from_email=settings.DEFAULT_FROM_EMAIL
     )
     return "Done"
 
 
 @shared_task(bind=True)
+@outbox.idempotent
 def send_task_email_to_assignee_updated(self, assignee_email, assignee_name, task_title):
 
     tasklist_url = settings.DOMAIN_NAME + reverse('tasklist')
@@ -38,20 +43,21 @@ def send_task_email_to_assignee_updated(self, assignee_email, assignee_name, tas
         f'The task with the title {task_title} has been updated. \n\n'
         f'For further questions, please refer to the URL: {tasklist_url}'
     )
-    send_mail(
+    mail.queue_mail(
         subject=mail_subject,
         message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[assignee_email],
+        from_email=settings.DEFAULT_FROM_EMAIL
     )
     return "Done"
 
 
 @shared_task(bind=True)
-def notify_superusers_of_task_updated(self, task_title, task_assignee):
+@outbox.idempotent
+def notify_superusers_of_task_updated(self, task_title, task_assignee, assignee_id=None, priority=None):
 
-    superusers = get_user_model().objects.filter(is_superuser=True)
-    superuser_emails = [user.email for user in superusers if user.email]
+    # Cached list, filtered by the superusers' subscriptions
+    superuser_emails = recipients.superuser_emails(assignee_id, priority)
 
     tasklist_admin_url = settings.DOMAIN_NAME + reverse('admin-tasklist')
 
@@ -61,16 +67,17 @@ def notify_superusers_of_task_updated(self, task_title, task_assignee):
         f'The task status with the title {task_title} has been updated by {task_assignee}. \n\n'
         f'To have a look at every available task, please refer to the URL: {tasklist_admin_url}'
     )
-    send_mail(
+    mail.queue_mail(
         subject=mail_subject,
         message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=superuser_emails,
+        from_email=settings.DEFAULT_FROM_EMAIL
     )
     return "Done"
 
 
 @shared_task(bind=True)
+@outbox.idempotent
 def warn_users_one_day_before_deadline(self, assignee_email, assignee_name, task_title, task_deadline):
 
     tasklist_url = settings.DOMAIN_NAME + reverse('tasklist')
@@ -81,10 +88,130 @@ def warn_users_one_day_before_deadline(self, assignee_email, assignee_name, task
         f'The Deadline of the task with the title {task_title} is set to be due in 24 hours ({task_deadline}). Please make sure to finish the task or console with your team leader. \n\n'
         f'For further questions, please refer to the URL: {tasklist_url}'
     )
-    send_mail(
+    mail.queue_mail(
         subject=mail_subject,
         message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[assignee_email],
+        from_email=settings.DEFAULT_FROM_EMAIL
     )
     return "Done"
+
+
+@shared_task(bind=True)
+def send_deadline_warnings(self):
+    # Periodic job run by celery beat. Tasks are claimed in batches by setting
+    # warned_at in the transaction that queues their warning, so every
+    # deadline is warned about once, even when several beat runs overlap.
+    now = timezone.now()
+    window_end = now + settings.DEADLINE_WARNING_WINDOW
+
+    while True:
+        with transaction.atomic():
+            tasks = list(
+                Task.objects
+                .select_for_update(skip_locked=True, of=('self',))
+                .select_related('assignee')
+                .filter(
+                    warned_at__isnull=True,
+                    deadline__gt=now,
+                    deadline__lte=window_end
+                )
+                .exclude(status=Task.Status.DONE)
+                .order_by('deadline')[:settings.DEADLINE_WARNING_BATCH_SIZE]
+            )
+            if not tasks:
+                break
+            Task.objects.filter(pk__in=[task.pk for task in tasks]).update(warned_at=now)
+
+            for task in tasks:
+                outbox.enqueue(
+                    warn_users_one_day_before_deadline,
+                    task.assignee.email,
+                    task.assignee.username,
+                    task.title,
+                    task.deadline,
+                    dedup_key=f'deadline-warning:{task.pk}:{task.deadline.isoformat()}'
+                )
+    return "Done"
+
+
+@shared_task(bind=True)
+def send_queued_emails(self):
+    # Periodic job run by celery beat that drains the mail queue in chunks
+    mail.send_queued_emails()
+    return "Done"
+
+
+@shared_task(bind=True)
+def purge_outbox(self):
+    # Periodic job run by celery beat that drops old outbox bookkeeping
+    outbox.purge()
+    return "Done"
+
+
+@shared_task(bind=True)
+def refresh_task_deadline_stats(self):
+    # Periodic job run by celery beat for the overdue/due-soon totals
+    stats.refresh_deadline_stats()
+    return "Done"
+
+
+@shared_task(bind=True)
+def reconcile_task_stats(self):
+    # Periodic job run by celery beat that corrects drift in the counters
+    stats.reconcile_counts()
+    return "Done"
+
+
+@shared_task(bind=True)
+def archive_done_tasks(self):
+    # Periodic job run by celery beat that moves old done tasks to the archive
+    archive.archive()
+    return "Done"
+
+
+@shared_task(bind=True)
+@outbox.idempotent
+def send_bulk_task_notifications(self, task_ids):
+    # One job for a whole bulk write instead of one publish per task. Updates
+    # go through send_coalesced_update_notifications.
+    tasks = Task.objects.select_related('assignee').filter(pk__in=task_ids)
+    for task in tasks.iterator():
+        send_task_email_to_assignee_created(
+            task.assignee.email,
+            task.assignee.username,
+            task.title,
+            task.startDate,
+            task.deadline
+        )
+    return "Done"
+
+
+@shared_task(bind=True)
+@outbox.idempotent
+def send_coalesced_update_notifications(self, task_ids):
+    # Runs once per notification window and sends one update mail per task
+    # for all edits recorded since the window opened. Edits arriving after
+    # the rows are claimed open a new window.
+    with transaction.atomic():
+        pending = list(
+            PendingTaskNotification.objects
+            .select_for_update(of=('self',))
+            .select_related('task__assignee')
+            .filter(task_id__in=task_ids)
+        )
+        PendingTaskNotification.objects.filter(pk__in=[item.pk for item in pending]).delete()
+
+    for item in pending:
+        send_task_email_to_assignee_updated(
+            item.task.assignee.email,
+            item.task.assignee.username,
+            item.task.title
+        )
+        notify_superusers_of_task_updated(
+            item.task.title,
+            ', '.join(item.updated_by),
+            item.task.assignee_id,
+            item.task.priority
+        )
+    return "Done"
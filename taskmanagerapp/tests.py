@@ -1,6 +1,6 @@
-from django.test import TestCase, Client, TransactionTestCase
+from django.test import TestCase, Client, AsyncClient, TransactionTestCase, override_settings
 from rest_framework.test import APIClient
-from taskmanagerapp.models import Task
+from taskmanagerapp.models import Task, QueuedEmail, TaskStat, PendingTaskNotification, NotificationSubscription, OutboxMessage, ArchivedTask, ProcessedJob
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -8,16 +8,49 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import pytz
 from taskmanagerapp.forms import SignupForm, LoginForm
+from taskmanagerapp.serializers import TaskSerializer, serialize_task_rows, task_rows
 from django.contrib.auth import authenticate
+import asyncio
+import base64
+from asgiref.sync import sync_to_async
+import csv
+import io
 import json
+import os
+import redis
+import tempfile
+from urllib.parse import parse_qs, urlparse
+from types import SimpleNamespace
 from unittest.mock import patch
+from taskmanagerapp.benchmarks import data as benchmark_data
+from importlib import import_module
+from django.apps import apps
 from taskmanagerapp.tasks import (
     send_task_email_to_assignee_created,
     send_task_email_to_assignee_updated,
     notify_superusers_of_task_updated,
-    warn_users_one_day_before_deadline
+    warn_users_one_day_before_deadline,
+    send_deadline_warnings,
+    archive_done_tasks,
+    purge_outbox,
+    send_bulk_task_notifications,
+    send_coalesced_update_notifications,
+    refresh_task_deadline_stats,
+    send_queued_emails as send_queued_emails_task
 )
 from django.conf import settings
+from backend.celery import app as celery_app
+from django.core import mail
+from django.core.mail import get_connection
+from taskmanagerapp.mail import send_queued_emails
+from django.core.management import call_command, CommandError
+from io import StringIO
+from django.db import OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from taskmanagerapp import archive, events, export, metrics, outbox, recipients, search, services, stats
+from taskmanagerapp import cache as task_cache
+from django.core.cache import cache
+from django.utils.http import http_date
 
 
 class TaskModelTest (TestCase):
@@ -448,8 +481,8 @@ class CeleryTasksTest(TestCase):
         self.task_deadline = '2024-07-24T00:00:00Z'
         self.task_assignee = 'Test User'
 
-    @patch('taskmanagerapp.tasks.send_mail')
-    def test_send_task_email_to_assignee_created(self, mock_send_mail):
+    @patch('taskmanagerapp.tasks.mail.queue_mail')
+    def test_send_task_email_to_assignee_created(self, mock_queue_mail):
         # Call the task
         result = send_task_email_to_assignee_created(
             assignee_email=self.assignee_email,
@@ -458,8 +491,8 @@ class CeleryTasksTest(TestCase):
             task_startdate=self.task_startdate,
             task_deadline=self.task_deadline
         )
-        # Check if send_mail was called with correct parameters
-        mock_send_mail.assert_called_once_with(
+        # Check if the mail was queued with correct parameters
+        mock_queue_mail.assert_called_once_with(
             subject=f'Task {self.task_title} has been created',
             message=(
                 f'Hello {self.assignee_name}! \n\n'
@@ -471,16 +504,16 @@ class CeleryTasksTest(TestCase):
         )
         self.assertEqual(result, "Done")
 
-    @patch('taskmanagerapp.tasks.send_mail')
-    def test_send_task_email_to_assignee_updated(self, mock_send_mail):
+    @patch('taskmanagerapp.tasks.mail.queue_mail')
+    def test_send_task_email_to_assignee_updated(self, mock_queue_mail):
         # Call the task
         result = send_task_email_to_assignee_updated(
             assignee_email=self.assignee_email,
             assignee_name=self.assignee_name,
             task_title=self.task_title
         )
-        # Check if send_mail was called with correct parameters
-        mock_send_mail.assert_called_once_with(
+        # Check if the mail was queued with correct parameters
+        mock_queue_mail.assert_called_once_with(
             subject=f'Task {self.task_title} has been updated',
             message=(
                 f'Hello {self.assignee_name}! \n\n'
@@ -492,21 +525,21 @@ class CeleryTasksTest(TestCase):
         )
         self.assertEqual(result, "Done")
 
-    @patch('taskmanagerapp.tasks.send_mail')
-    @patch('taskmanagerapp.tasks.get_user_model')
-    def test_notify_superusers_of_task_updated(self, mock_get_user_model, mock_send_mail):
+    @patch('taskmanagerapp.tasks.mail.queue_mail')
+    @patch('taskmanagerapp.tasks.recipients.superuser_emails')
+    def test_notify_superusers_of_task_updated(self, mock_superuser_emails, mock_queue_mail):
         # Mock the superusers
-        mock_get_user_model.return_value.objects.filter.return_value = [
-            User(email='superuser@example.com'),
-            User(email='another_superuser@example.com'),
+        mock_superuser_emails.return_value = [
+            'superuser@example.com',
+            'another_superuser@example.com',
         ]
         # Call the task
         result = notify_superusers_of_task_updated(
             task_title=self.task_title,
             task_assignee=self.task_assignee
         )
-        # Check if send_mail was called with correct parameters
-        mock_send_mail.assert_called_once_with(
+        # Check if the mail was queued with correct parameters
+        mock_queue_mail.assert_called_once_with(
             subject=f'Status of Task {self.task_title} has been updated by {self.task_assignee}',
             message=(
                 f'Hello Superuser! \n\n'
@@ -521,8 +554,8 @@ class CeleryTasksTest(TestCase):
         )
         self.assertEqual(result, "Done")
 
-    @patch('taskmanagerapp.tasks.send_mail')
-    def test_warn_users_one_day_before_deadline(self, mock_send_mail):
+    @patch('taskmanagerapp.tasks.mail.queue_mail')
+    def test_warn_users_one_day_before_deadline(self, mock_queue_mail):
         # Call the task
         result = warn_users_one_day_before_deadline(
             assignee_email=self.assignee_email,
@@ -530,8 +563,8 @@ class CeleryTasksTest(TestCase):
             task_title=self.task_title,
             task_deadline=self.task_deadline
         )
-        # Check if send_mail was called with correct parameters
-        mock_send_mail.assert_called_once_with(
+        # Check if the mail was queued with correct parameters
+        mock_queue_mail.assert_called_once_with(
             subject=f'Deadline of Task {self.task_title} is approaching',
             message=(
                 f'Hello {self.assignee_name}! \n\n'
@@ -542,3 +575,1884 @@ class CeleryTasksTest(TestCase):
             recipient_list=[self.assignee_email],
         )
         self.assertEqual(result, "Done")
+
+
+# Write tests for the task service layer
+class TaskServiceTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.task_model = Task.objects.create(
+            title="Unit Test 1",
+            description="This is the first unit test",
+            status="To Do",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC),
+            priority="High"
+        )
+
+    def test_user_tasklist_renders_in_process(self):
+        self.client.login(username='bb', password='12345678')
+        response = self.client.get(reverse('tasklist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['id'] for task in response.context['tasks']], [self.task_model.id])
+
+    def test_admin_tasklist_renders_in_process(self):
+        self.client.login(username='aa', password='12345678')
+        response = self.client.get(reverse('admin-tasklist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tasks'][0]['assignee_name'], 'bb')
+
+    @patch('taskmanagerapp.services.notify_assignee_email')
+    def test_task_create_view(self, mock_notify):
+        self.client.login(username='aa', password='12345678')
+        response = self.client.post(reverse('task-create'), {
+            'title': 'Created from form',
+            'description': 'Form description',
+            'status': 'To Do',
+            'assignee': self.user.id,
+            'startDate': '2024-07-22T09:00',
+            'deadline': '2024-07-23T09:00',
+            'priority': 'Low'
+        })
+        self.assertRedirects(response, reverse('admin-tasklist'), fetch_redirect_response=False)
+        task = Task.objects.get(title='Created from form')
+        self.assertEqual(task.startDate, datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC))
+        mock_notify.assert_called_once()
+
+    def test_task_delete_view(self):
+        self.client.login(username='aa', password='12345678')
+        response = self.client.post(reverse('task-delete', args=[self.task_model.id]))
+        self.assertRedirects(response, reverse('admin-tasklist'), fetch_redirect_response=False)
+        self.assertFalse(Task.objects.filter(id=self.task_model.id).exists())
+
+    def test_update_task_permission_denied(self):
+        other = User.objects.create_user(username='cc', password='12345678')
+        with self.assertRaises(PermissionError):
+            services.update_task(other, self.task_model, {'status': 'Done'})
+
+
+class TaskPaginationTest(TestCase):
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        # Tasks share deadlines and priorities so that id has to break ties
+        for i in range(7):
+            Task.objects.create(
+                title=f"Task {i % 3}",
+                description="Paginated task",
+                status="To Do",
+                assignee=self.user if i % 2 else self.superuser,
+                startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+                deadline=datetime(2024, 7, 23 + i % 2, 0, 0, 0, tzinfo=pytz.UTC),
+                priority="High" if i % 2 else "Low"
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def collect_pages(self, sort_by, order):
+        ids = []
+        url = f'/api/tasks/?sort={sort_by}&order={order}&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(task['id'] for task in response.json()['results'])
+            url = response.json()['next']
+        return ids
+
+    def test_cursor_pages_match_full_listing(self):
+        for sort_by in services.SORT_FIELDS:
+            for order in ['asc', 'desc']:
+                full = self.client.get(f'/api/tasks/?sort={sort_by}&order={order}').json()
+                self.assertEqual(
+                    self.collect_pages(sort_by, order),
+                    [task['id'] for task in full],
+                    msg=f'{sort_by} {order}'
+                )
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        response = self.client.get('/api/tasks/?sort=title&page_size=2')
+        cursor = parse_qs(urlparse(response.json()['next']).query)['cursor'][0]
+        response = self.client.get('/api/tasks/', {'sort': 'deadline', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursor(self):
+        cursors = [
+            ['deadline', 'asc', ['2024-07-22T00:00:00+00:00'], 1],
+            ['deadline', 'asc', '2024-07-22T00:00:00+00:00', [1]],
+            ['deadline', 'asc', '2024-07-22T00:00:00+00:00', True],
+            ['deadline', 'asc', 'tomorrow', 1],
+            ['assignee', 'asc', {'id': 1}, 1],
+        ]
+        for payload in cursors:
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get('/api/tasks/', {'sort': payload[0], 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_stream_ndjson(self):
+        response = self.client.get('/api/tasks/?stream=ndjson&sort=title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        full = self.client.get('/api/tasks/?sort=title').json()
+        self.assertEqual(rows, full)
+
+
+# Query-count regression tests: listings must not grow with the number of tasks
+class TaskQueryCountTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='12345678')
+            for i in range(5)
+        ]
+        for i in range(25):
+            Task.objects.create(
+                title=f"Task {i}",
+                description="Query count task",
+                assignee=self.users[i % 5],
+                startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+                deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+            )
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.superuser)
+
+    def test_api_list_queries(self):
+        with self.assertNumQueries(1):
+            response = self.api_client.get('/api/tasks/')
+        self.assertEqual(len(response.json()), 25)
+
+    def test_api_list_paginated_queries(self):
+        with self.assertNumQueries(1):
+            response = self.api_client.get('/api/tasks/?page_size=10')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_api_list_stream_queries(self):
+        with self.assertNumQueries(1):
+            response = self.api_client.get('/api/tasks/?stream=ndjson')
+            rows = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows), 25)
+
+    def test_user_tasklist_queries(self):
+        self.client.login(username='user0', password='12345678')
+        # session, user and the task list
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tasklist'))
+        self.assertEqual(len(response.context['tasks']), 5)
+
+    def test_admin_tasklist_queries(self):
+        self.client.login(username='aa', password='12345678')
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin-tasklist'))
+        self.assertEqual(len(response.context['tasks']), 25)
+
+    def test_task_admin_changelist_queries(self):
+        self.client.login(username='aa', password='12345678')
+        response = self.client.get(reverse('admin:taskmanagerapp_task_changelist'))
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:taskmanagerapp_task_changelist'))
+        user_queries = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "auth_user" WHERE "auth_user"."id" =' in query['sql']
+        ]
+        # only the request user is looked up on its own, assignees are joined
+        self.assertEqual(len(user_queries), 1)
+
+
+class ExplainTasksCommandTest(TestCase):
+
+    def test_explaintasks_rolls_back_seeded_data(self):
+        out = StringIO()
+        call_command('explaintasks', tasks=50, users=3, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Seeded 50 tasks for 3 users', output)
+        self.assertIn('assignee sort=deadline order=asc', output)
+        self.assertIn('open tasks due within the warning window', output)
+        self.assertFalse(Task.objects.exists())
+
+
+class DeadlineWarningTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        now = timezone.now()
+        self.due_soon = self.create_task("Due soon", now + timedelta(hours=12))
+        self.create_task("Due later", now + timedelta(days=3))
+        self.create_task("Already done", now + timedelta(hours=12), status="Done")
+        self.create_task("Overdue", now - timedelta(hours=1))
+
+    def create_task(self, title, deadline, status="To Do"):
+        return Task.objects.create(
+            title=title,
+            description="Deadline warning task",
+            status=status,
+            assignee=self.user,
+            startDate=timezone.now(),
+            deadline=deadline
+        )
+
+    @patch('taskmanagerapp.tasks.outbox.enqueue')
+    def test_warnings_are_sent_once(self, mock_warn):
+        send_deadline_warnings()
+        mock_warn.assert_called_once_with(
+            warn_users_one_day_before_deadline,
+            'testb@test.com',
+            'bb',
+            'Due soon',
+            self.due_soon.deadline,
+            dedup_key=f'deadline-warning:{self.due_soon.id}:{self.due_soon.deadline.isoformat()}'
+        )
+        self.due_soon.refresh_from_db()
+        self.assertIsNotNone(self.due_soon.warned_at)
+
+        mock_warn.reset_mock()
+        send_deadline_warnings()
+        mock_warn.assert_not_called()
+
+    def count_warnings(self):
+        return OutboxMessage.objects.filter(task_name=warn_users_one_day_before_deadline.name).count()
+
+    def test_moved_deadline_is_warned_again(self):
+        send_deadline_warnings()
+        self.assertEqual(self.count_warnings(), 1)
+
+        new_deadline = (timezone.now() + timedelta(hours=6)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        services.update_task(self.superuser, self.due_soon, {'deadline': new_deadline})
+        self.due_soon.refresh_from_db()
+        self.assertIsNone(self.due_soon.warned_at)
+
+        send_deadline_warnings()
+        self.assertEqual(self.count_warnings(), 2)
+
+    @override_settings(DEADLINE_WARNING_BATCH_SIZE=1)
+    def test_warnings_are_claimed_in_batches(self):
+        self.create_task("Also due soon", timezone.now() + timedelta(hours=20))
+        send_deadline_warnings()
+        self.assertEqual(self.count_warnings(), 2)
+
+    def test_migration_marks_tasks_warned_before_deploy(self):
+        migration = import_module('taskmanagerapp.migrations.0017_mark_warned_tasks')
+        later = self.create_task("Due later still", timezone.now() + timedelta(days=2))
+        migration.mark_warned_tasks(apps, None)
+
+        self.due_soon.refresh_from_db()
+        later.refresh_from_db()
+        self.assertIsNotNone(self.due_soon.warned_at)
+        self.assertIsNone(later.warned_at)
+        send_deadline_warnings()
+        self.assertEqual(self.count_warnings(), 0)
+
+
+class MailQueueTest(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            send_task_email_to_assignee_updated(
+                assignee_email='test@example.com' if i % 2 else 'other@example.com',
+                assignee_name='Test User',
+                task_title=f'Task {i}'
+            )
+
+    def test_tasks_queue_instead_of_sending(self):
+        self.assertEqual(QueuedEmail.objects.count(), 5)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_queue_is_drained_in_chunks_over_one_connection(self):
+        with patch('taskmanagerapp.mail.get_connection', wraps=get_connection) as mock_connection:
+            sent = send_queued_emails(batch_size=2, reuse_connection=True, digest=False)
+        self.assertEqual(sent, 5)
+        self.assertEqual(mock_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].subject, 'Task Task 0 has been updated')
+        self.assertEqual(mail.outbox[0].to, ['other@example.com'])
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_connection_per_chunk(self):
+        with patch('taskmanagerapp.mail.get_connection', wraps=get_connection) as mock_connection:
+            send_queued_emails(batch_size=2, reuse_connection=False, digest=False)
+        # three chunks and a final empty check
+        self.assertEqual(mock_connection.call_count, 4)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_max_messages_per_run(self):
+        sent = send_queued_emails(batch_size=2, reuse_connection=True, digest=False, max_messages=3)
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+
+    def test_digest_mode(self):
+        send_queued_emails(batch_size=10, reuse_connection=True, digest=True)
+        self.assertEqual(len(mail.outbox), 2)
+        digest = next(message for message in mail.outbox if message.to == ['other@example.com'])
+        self.assertEqual(digest.subject, '3 task notifications')
+        self.assertIn('Task Task 4 has been updated', digest.body)
+
+    def test_failed_send_keeps_queue(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                send_queued_emails(batch_size=10, reuse_connection=True, digest=False)
+        self.assertEqual(QueuedEmail.objects.count(), 5)
+
+
+class TaskBulkApiTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def task_data(self, title, **kwargs):
+        data = {
+            'title': title,
+            'description': 'Bulk task',
+            'status': 'To Do',
+            'assignee': self.user.id,
+            'startDate': '2024-07-22T00:00:00Z',
+            'deadline': '2024-07-23T00:00:00Z',
+            'priority': 'Low'
+        }
+        data.update(kwargs)
+        return data
+
+    @patch('taskmanagerapp.services.outbox.enqueue')
+    def test_bulk_create_reports_item_errors(self, mock_notify):
+        response = self.client.post('/api/tasks/bulk/', [
+            self.task_data('Bulk 1'),
+            self.task_data('Bulk 2', status='Unknown'),
+            self.task_data('Bulk 3'),
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Bulk 1', 'Bulk 3'])
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertIn('status', response.json()['errors'][0]['errors'])
+        self.assertEqual(Task.objects.count(), 2)
+        # one grouped notification job for the whole batch
+        mock_notify.assert_called_once_with(
+            send_bulk_task_notifications,
+            list(Task.objects.order_by('id').values_list('id', flat=True))
+        )
+
+    @patch('taskmanagerapp.services.outbox.enqueue')
+    def test_bulk_update(self, mock_notify):
+        first = Task.objects.create(**dict(self.task_data('First'), assignee=self.user))
+        second = Task.objects.create(**dict(self.task_data('Second'), assignee=self.user))
+        response = self.client.patch('/api/tasks/bulk/', [
+            {'id': first.id, 'status': 'Done'},
+            {'id': second.id, 'deadline': '2024-07-25T00:00:00Z'},
+            {'id': 9999, 'status': 'Done'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'], [{'index': 2, 'errors': {'id': ['Task not found.']}}])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'Done')
+        self.assertEqual(second.deadline, datetime(2024, 7, 25, 0, 0, 0, tzinfo=pytz.UTC))
+        mock_notify.assert_called_once_with(
+            send_coalesced_update_notifications,
+            [second.id],
+            countdown=settings.TASK_UPDATE_NOTIFICATION_WINDOW
+        )
+
+    def test_bulk_delete(self):
+        task = Task.objects.create(**dict(self.task_data('Doomed'), assignee=self.user))
+        response = self.client.delete('/api/tasks/bulk/', [task.id, 9999], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [task.id])
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_delete_reports_invalid_ids(self):
+        task = Task.objects.create(**dict(self.task_data('Doomed'), assignee=self.user))
+        response = self.client.delete('/api/tasks/bulk/', [{'id': task.id}, 'abc', True, task.id], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [task.id])
+        self.assertEqual(
+            response.json()['errors'],
+            [{'index': index, 'errors': {'id': ['A valid integer is required.']}} for index in range(3)]
+        )
+
+    def test_bulk_requires_superuser_and_list(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/tasks/bulk/', [self.task_data('Denied')], format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.post('/api/tasks/bulk/', self.task_data('Not a list'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_notifications_are_queued(self):
+        Task.objects.create(**dict(self.task_data('Notify'), assignee=self.user))
+        send_bulk_task_notifications([Task.objects.get().id])
+        self.assertEqual(QueuedEmail.objects.get().subject, 'Task Notify has been created')
+
+
+class TaskListCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.other_user = User.objects.create_user(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.task_model = Task.objects.create(
+            title="Cached task",
+            description="Cached task",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_second_request_is_served_from_cache(self):
+        self.client.get('/api/tasks/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.json()[0]['title'], 'Cached task')
+        self.assertEqual(task_cache.get_stats()['hits'], 1)
+        self.assertEqual(task_cache.get_stats()['misses'], 1)
+
+    def test_generation_is_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.task_model.save()
+            # A concurrent reader would cache the old rows under this one
+            generation = task_cache.get_generation(self.user.id)
+            all_generation = task_cache.get_generation(task_cache.ALL_SCOPE)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(task_cache.get_generation(self.user.id), generation)
+        self.assertNotEqual(task_cache.get_generation(task_cache.ALL_SCOPE), all_generation)
+
+    def test_save_invalidates_assignee_and_superuser_lists(self):
+        self.client.get('/api/tasks/')
+        services.get_task_list_data(self.superuser)
+        self.task_model.title = 'Renamed task'
+        self.task_model.save()
+        self.assertEqual(self.client.get('/api/tasks/').json()[0]['title'], 'Renamed task')
+        self.assertEqual(services.get_task_list_data(self.superuser)[0][0]['title'], 'Renamed task')
+
+    def test_reassignment_invalidates_previous_assignee(self):
+        self.assertEqual(len(self.client.get('/api/tasks/').json()), 1)
+        self.task_model.assignee = self.other_user
+        self.task_model.save()
+        self.assertEqual(self.client.get('/api/tasks/').json(), [])
+
+    def test_delete_invalidates(self):
+        self.client.get('/api/tasks/')
+        self.task_model.delete()
+        self.assertEqual(self.client.get('/api/tasks/').json(), [])
+
+    def test_bulk_update_invalidates(self):
+        self.client.get('/api/tasks/')
+        services.bulk_update_tasks(self.superuser, [{'id': self.task_model.id, 'status': 'Done'}])
+        self.assertEqual(self.client.get('/api/tasks/').json()[0]['status'], 'Done')
+
+    def test_sort_and_page_are_part_of_the_key(self):
+        Task.objects.create(
+            title="Another task",
+            description="Cached task",
+            assignee=self.user
+        )
+        asc = self.client.get('/api/tasks/?sort=title').json()
+        desc = self.client.get('/api/tasks/?sort=title&order=desc').json()
+        self.assertEqual(asc, list(reversed(desc)))
+        page = self.client.get('/api/tasks/?sort=title&page_size=1').json()
+        self.assertEqual(page['results'], asc[:1])
+
+    def test_stats_endpoint_requires_superuser(self):
+        self.assertEqual(self.client.get('/api/tasks/cache-stats/').status_code, 403)
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/tasks/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hit_rate', response.json())
+
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.other_user = User.objects.create_user(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+        self.task_model = Task.objects.create(
+            title="Conditional task",
+            description="Conditional task",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_not_modified_without_queries(self):
+        response = self.client.get('/api/tasks/?sort=title')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/?sort=title', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_on_write_and_sort(self):
+        etag = self.client.get('/api/tasks/').get('ETag')
+        self.assertNotEqual(self.client.get('/api/tasks/?sort=title')['ETag'], etag)
+
+        self.task_model.title = 'Changed'
+        self.task_model.save()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['title'], 'Changed')
+
+    def test_etag_issued_before_commit_is_not_revalidated_after(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.task_model.title = 'Changed'
+            self.task_model.save()
+            # A client fetching while the write is uncommitted gets this ETag
+            etag = self.client.get('/api/tasks/')['ETag']
+        for callback in callbacks:
+            callback()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_if_modified_since(self):
+        last_modified = self.client.get('/api/tasks/')['Last-Modified']
+        response = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_version_survives_cache_eviction(self):
+        cache.clear()
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(
+            response['Last-Modified'],
+            http_date(Task.objects.get().last_modified.timestamp())
+        )
+
+    def test_detail(self):
+        response = self.client.get(f'/api/tasks/{self.task_model.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Conditional task')
+
+        response = self.client.get(
+            f'/api/tasks/{self.task_model.id}/',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_permissions(self):
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task_model.id}/').status_code, 403)
+        self.assertEqual(self.client.get('/api/tasks/9999/').status_code, 404)
+
+
+class TaskRowSerializerTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        for i in range(5):
+            Task.objects.create(
+                title=f"Row task {i}",
+                description="Fast path task",
+                status="In Review",
+                assignee=self.user,
+                startDate=datetime(2024, 7, 22, 23, 30, 15, 123456, tzinfo=pytz.UTC) + timedelta(hours=i),
+                deadline=datetime(2024, 12, 31, 23, 59, 59, tzinfo=pytz.UTC) - timedelta(days=i),
+                priority="Very High"
+            )
+
+    def assert_parity(self):
+        tasks = services.list_tasks(self.user)
+        self.assertEqual(
+            json.dumps(serialize_task_rows(task_rows(tasks))),
+            json.dumps(TaskSerializer(tasks, many=True).data)
+        )
+
+    def test_output_matches_task_serializer(self):
+        self.assert_parity()
+
+    def test_output_matches_in_other_timezone(self):
+        with timezone.override(pytz.timezone('Asia/Seoul')):
+            self.assert_parity()
+
+    def test_benchserializer_command(self):
+        out = StringIO()
+        call_command('benchserializer', rows=20, repeat=1, stdout=out)
+        self.assertIn('Speedup', out.getvalue())
+        self.assertNotIn('differs', out.getvalue())
+
+
+@override_settings(TASK_EVENTS_ENABLED=True)
+class TaskEventsTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.other_user = User.objects.create_user(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+
+    def create_task(self):
+        return Task.objects.create(
+            title="Live task",
+            description="Live task",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+
+    def published(self, mock_client):
+        pipeline = mock_client.return_value.pipeline.return_value
+        return [
+            (call.args[0], json.loads(call.args[1]))
+            for call in pipeline.publish.call_args_list
+        ]
+
+    @patch('taskmanagerapp.events.get_redis_client')
+    def test_save_publishes_after_commit(self, mock_client):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.create_task()
+        published = self.published(mock_client)
+        self.assertEqual(
+            [channel for channel, _ in published],
+            [f'task-events:{self.user.id}', 'task-events:all']
+        )
+        self.assertEqual(published[0][1]['action'], 'saved')
+        self.assertEqual(published[0][1]['data']['id'], task.id)
+        self.assertEqual(published[0][1]['data']['assignee_username'], 'bb')
+
+    @patch('taskmanagerapp.events.get_redis_client')
+    def test_reassignment_and_delete(self, mock_client):
+        task = self.create_task()
+        task_id = task.id
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assignee = self.other_user
+            task.save()
+        self.assertIn(
+            (f'task-events:{self.user.id}', {'action': 'deleted', 'data': {'id': task_id}}),
+            self.published(mock_client)
+        )
+
+        mock_client.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(self.published(mock_client), [
+            (f'task-events:{self.other_user.id}', {'action': 'deleted', 'data': {'id': task_id}}),
+            ('task-events:all', {'action': 'deleted', 'data': {'id': task_id}}),
+        ])
+
+    @patch('taskmanagerapp.events.get_redis_client')
+    def test_publish_errors_do_not_fail_writes(self, mock_client):
+        mock_client.return_value.pipeline.return_value.execute.side_effect = redis.ConnectionError
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task()
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_stream_fans_out_deltas(self):
+        async def read_stream():
+            broadcaster = events.TaskEventBroadcaster()
+            with patch.object(events, 'broadcaster', broadcaster), \
+                    patch.object(broadcaster, 'listen', return_value=asyncio.sleep(0)):
+                stream = events.stream_events(self.user.id)
+                first = await stream.__anext__()
+                broadcaster.dispatch(
+                    f'task-events:{self.user.id}',
+                    json.dumps({'action': 'deleted', 'data': {'id': 1}})
+                )
+                # Other assignees' deltas are not delivered
+                broadcaster.dispatch(
+                    f'task-events:{self.other_user.id}',
+                    json.dumps({'action': 'deleted', 'data': {'id': 2}})
+                )
+                second = await stream.__anext__()
+                await stream.aclose()
+                return first, second, broadcaster.subscribers
+
+        first, second, subscribers = asyncio.run(read_stream())
+        self.assertEqual(first, ': connected\n\n')
+        self.assertEqual(second, 'event: deleted\ndata: {"id": 1}\n\n')
+        self.assertEqual(subscribers, {})
+
+    def test_events_endpoint_permissions(self):
+        self.assertEqual(self.client.get(reverse('task-events')).status_code, 401)
+        self.client.login(username='bb', password='12345678')
+        response = self.client.get(reverse('task-events'), {'assignee': self.other_user.id})
+        self.assertEqual(response.status_code, 403)
+
+    def test_events_need_asgi(self):
+        self.client.login(username='bb', password='12345678')
+        self.assertEqual(self.client.get(reverse('task-events')).status_code, 501)
+        # Pages served under WSGI do not open the stream
+        self.assertNotContains(self.client.get(reverse('tasklist')), 'EventSource(')
+
+    async def test_asgi_page_subscribes_to_its_assignee(self):
+        superuser = await User.objects.acreate_user(username='aa', password='12345678', is_superuser=True)
+        async_client = AsyncClient()
+        await async_client.aforce_login(superuser)
+        response = await async_client.get(reverse('tasklist'), {'assignee': self.user.id})
+        self.assertContains(response, f"EventSource('/api/tasks/events/?assignee={self.user.id}')")
+
+
+class AsyncTaskApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.other_user = User.objects.create_user(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+        self.task_model = Task.objects.create(
+            title="Async task",
+            description="Async task",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+        self.async_client = AsyncClient()
+        self.headers = self.auth_headers(self.user)
+
+    def auth_headers(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    async def test_list_matches_sync_api(self):
+        response = await self.async_client.get('/api/async/tasks/?sort=title', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['id'], self.task_model.id)
+
+        sync_client = APIClient()
+        sync_client.force_authenticate(user=self.user)
+        sync_response = await asyncio.to_thread(sync_client.get, '/api/tasks/?sort=title')
+        self.assertEqual(response.json(), sync_response.json())
+
+    async def test_list_pagination(self):
+        response = await self.async_client.get('/api/async/tasks/?page_size=1', headers=self.headers)
+        self.assertEqual(response.json()['next'], None)
+        self.assertEqual(len(response.json()['results']), 1)
+
+        response = await self.async_client.get('/api/async/tasks/?cursor=bad', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get('/api/async/tasks/')
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get('/api/async/tasks/', headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_detail_permissions(self):
+        response = await self.async_client.get(f'/api/async/tasks/{self.task_model.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['assignee_username'], 'bb')
+
+        response = await self.async_client.get(
+            f'/api/async/tasks/{self.task_model.id}/',
+            headers=self.auth_headers(self.other_user)
+        )
+        self.assertEqual(response.status_code, 403)
+
+        response = await self.async_client.get('/api/async/tasks/999999/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_patch_records_notification(self):
+        response = await self.async_client.patch(
+            f'/api/async/tasks/{self.task_model.id}/',
+            {'deadline': '2024-07-25T00:00:00Z'},
+            content_type='application/json',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deadline'], '2024-07-25T00:00:00Z')
+        self.assertEqual(response.json()['assignee_email'], 'testb@test.com')
+        pending = await PendingTaskNotification.objects.aget(task=self.task_model)
+        self.assertEqual(pending.updated_by, ['bb'])
+
+        response = await self.async_client.patch(
+            f'/api/async/tasks/{self.task_model.id}/',
+            {'status': 'Unknown'},
+            content_type='application/json',
+            headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
+
+
+class CachedJWTAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def user_queries(self, queries):
+        return [query for query in queries if 'FROM "auth_user"' in query['sql']]
+
+    def test_user_lookup_is_cached(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.user_queries(queries.captured_queries)), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_queries(queries.captured_queries), [])
+
+    def test_user_changes_drop_the_snapshot(self):
+        self.client.get('/api/tasks/')
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_snapshot_keeps_permissions(self):
+        self.client.get('/api/tasks/')
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.get('/api/tasks/')
+
+        response = self.client.get('/api/tasks/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.report = self.create_task('Quarterly report', 'Collect the sales numbers')
+        self.numbers = self.create_task('Team meeting', 'Discuss the quarterly numbers')
+        self.other = self.create_task('Fix login page', 'Styling of the form')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def create_task(self, title, description):
+        return Task.objects.create(
+            title=title,
+            description=description,
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+
+    def search(self, q):
+        return list(search.search_tasks(Task.objects.all(), q).values_list('title', flat=True))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('quarterly'), ['Quarterly report', 'Team meeting'])
+
+    def test_all_terms_match_last_as_prefix(self):
+        self.assertEqual(self.search('quarterly num'), ['Quarterly report', 'Team meeting'])
+        self.assertEqual(self.search('login form'), ['Fix login page'])
+        self.assertEqual(self.search('login sales'), [])
+        self.assertEqual(self.search('  '), [])
+
+    def test_index_follows_updates(self):
+        self.other.title = 'Fix signup page'
+        self.other.save()
+        self.assertEqual(self.search('signup'), ['Fix signup page'])
+        self.assertEqual(self.search('login'), [])
+
+        response = self.client.patch(
+            '/api/tasks/bulk/',
+            [{'id': self.other.id, 'title': 'Bulk renamed'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('renamed'), ['Bulk renamed'])
+
+    def test_status_update_keeps_the_index(self):
+        with patch('taskmanagerapp.signals.search.index_tasks') as index_tasks:
+            response = self.client.patch(
+                f'/api/tasks/{self.other.id}/',
+                {'status': 'Done'},
+                format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.other.refresh_from_db()
+            self.other.save()
+            index_tasks.assert_not_called()
+
+            self.other.description = 'Styling of the signup form'
+            self.other.save()
+            index_tasks.assert_called_once_with([self.other.pk])
+
+    def test_bulk_create_is_indexed(self):
+        response = self.client.post('/api/tasks/bulk/', [{
+            'title': 'Imported budget',
+            'description': 'From the bulk endpoint',
+            'assignee': self.user.id,
+            'startDate': '2024-07-22T00:00:00Z',
+            'deadline': '2024-07-23T00:00:00Z'
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.search('budget'), ['Imported budget'])
+
+    def test_api_search(self):
+        response = self.client.get('/api/tasks/?q=quarterly&page_size=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['id'] for task in response.data], [self.report.id])
+
+        response = self.client.get('/api/tasks/?q=quarterly')
+        self.assertEqual(
+            [task['id'] for task in response.data],
+            [self.report.id, self.numbers.id]
+        )
+
+    def test_admin_search(self):
+        admin_client = Client()
+        admin_client.force_login(self.superuser)
+        self.superuser.is_staff = True
+        self.superuser.save()
+        response = admin_client.get('/admin/taskmanagerapp/task/?q=meeting')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Team meeting')
+        self.assertNotContains(response, 'Quarterly report')
+
+
+class TaskStatsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.other_user = User.objects.create_user(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def create_task(self, assignee, deadline, task_status='To Do'):
+        return Task.objects.create(
+            title="Stats task",
+            description="Stats task",
+            assignee=assignee,
+            status=task_status,
+            startDate=timezone.now() - timedelta(days=2),
+            deadline=deadline
+        )
+
+    def counts(self):
+        return {
+            (stat.assignee_id, stat.status, stat.priority): stat.count
+            for stat in TaskStat.objects.filter(count__gt=0)
+        }
+
+    def test_counts_follow_writes(self):
+        later = timezone.now() + timedelta(days=7)
+        task = self.create_task(self.user, later)
+        self.create_task(self.user, later)
+        self.assertEqual(self.counts(), {(self.user.id, 'To Do', 'High'): 2})
+
+        task.status = 'Done'
+        task.assignee = self.other_user
+        task.save()
+        self.assertEqual(self.counts(), {
+            (self.user.id, 'To Do', 'High'): 1,
+            (self.other_user.id, 'Done', 'High'): 1
+        })
+
+        task.delete()
+        self.assertEqual(self.counts(), {(self.user.id, 'To Do', 'High'): 1})
+
+    def test_bulk_writes_update_counts(self):
+        task = self.create_task(self.user, timezone.now() + timedelta(days=7))
+        self.client.post('/api/tasks/bulk/', [{
+            'title': 'Bulk task',
+            'description': 'Bulk task',
+            'assignee': self.user.id,
+            'priority': 'Low',
+            'startDate': '2024-07-22T00:00:00Z',
+            'deadline': '2024-07-23T00:00:00Z'
+        }], format='json')
+        self.client.patch('/api/tasks/bulk/', [{'id': task.id, 'status': 'In Review'}], format='json')
+        self.assertEqual(self.counts(), {
+            (self.user.id, 'To Do', 'Low'): 1,
+            (self.user.id, 'In Review', 'High'): 1
+        })
+
+        self.client.delete('/api/tasks/bulk/', [task.id], format='json')
+        self.assertEqual(self.counts(), {(self.user.id, 'To Do', 'Low'): 1})
+
+    def test_reconcile_fixes_drift(self):
+        self.create_task(self.user, timezone.now() + timedelta(days=7))
+        TaskStat.objects.update(count=5)
+        Task.objects.filter(assignee=self.user).update(priority='Low')
+        stats.reconcile_counts()
+        self.assertEqual(self.counts(), {(self.user.id, 'To Do', 'Low'): 1})
+        self.assertFalse(TaskStat.objects.filter(count=0).exists())
+
+    def test_reconcile_only_locks_drifted_assignees(self):
+        self.create_task(self.user, timezone.now() + timedelta(days=7))
+        self.create_task(self.other_user, timezone.now() + timedelta(days=7))
+        TaskStat.objects.filter(assignee=self.user).update(count=3)
+        with patch('taskmanagerapp.stats.reconcile_assignee', wraps=stats.reconcile_assignee) as reconcile_assignee:
+            self.assertEqual(stats.reconcile_counts(), 1)
+        reconcile_assignee.assert_called_once_with(self.user.id)
+        self.assertEqual(self.counts(), {
+            (self.user.id, 'To Do', 'High'): 1,
+            (self.other_user.id, 'To Do', 'High'): 1
+        })
+
+    def test_stats_endpoint(self):
+        now = timezone.now()
+        self.create_task(self.user, now - timedelta(hours=1))
+        self.create_task(self.user, now + timedelta(hours=2))
+        self.create_task(self.user, now - timedelta(hours=1), 'Done')
+        self.create_task(self.other_user, now + timedelta(days=7))
+        refresh_task_deadline_stats()
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(response.data['by_status'], {'To Do': 3, 'Done': 1})
+        self.assertEqual(response.data['overdue'], 1)
+        self.assertEqual(response.data['due_soon'], 1)
+        self.assertIsNotNone(response.data['deadlines_computed_at'])
+
+        user_client = APIClient()
+        user_client.force_authenticate(user=self.other_user)
+        response = user_client.get('/api/tasks/stats/')
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['overdue'], 0)
+        self.assertEqual(response.data['counts'][0]['assignee_username'], 'cc')
+
+        response = user_client.get(f'/api/tasks/stats/?assignee={self.user.id}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_deleting_assignee_removes_stats(self):
+        self.create_task(self.user, timezone.now() + timedelta(days=7))
+        self.user.delete()
+        self.assertEqual(self.counts(), {})
+
+
+class CeleryRoutingTest(TestCase):
+
+    def route(self, name):
+        return celery_app.amqp.router.route({}, name)['queue'].name
+
+    def test_notification_types_have_own_queues(self):
+        self.assertEqual(self.route('taskmanagerapp.tasks.send_task_email_to_assignee_created'), 'created-notifications')
+        self.assertEqual(self.route('taskmanagerapp.tasks.send_bulk_task_notifications'), 'created-notifications')
+        self.assertEqual(self.route('taskmanagerapp.tasks.notify_superusers_of_task_updated'), 'update-notifications')
+        self.assertEqual(self.route('taskmanagerapp.tasks.warn_users_one_day_before_deadline'), 'deadline-warnings')
+        self.assertEqual(self.route('taskmanagerapp.tasks.send_queued_emails'), 'mail')
+        self.assertEqual(self.route('backend.celery.divide'), 'celery')
+
+    def test_worker_settings(self):
+        self.assertTrue(settings.CELERY_TASK_ACKS_LATE)
+        self.assertEqual(settings.CELERY_WORKER_PREFETCH_MULTIPLIER, 1)
+
+
+class CoalescedNotificationTest(TestCase):
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.task_model = Task.objects.create(
+            title="Busy task",
+            description="Busy task",
+            assignee=self.user,
+            startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+            deadline=datetime(2024, 7, 23, 0, 0, 0, tzinfo=pytz.UTC)
+        )
+
+    def edit(self, user, day):
+        services.update_task(user, self.task_model, {'deadline': f'2024-07-{day}T00:00:00Z'})
+
+    @patch('taskmanagerapp.services.outbox.enqueue')
+    def test_edits_in_window_share_one_job(self, mock_job):
+        for day in range(24, 29):
+            self.edit(self.user if day % 2 else self.superuser, day)
+        mock_job.assert_called_once_with(
+            send_coalesced_update_notifications,
+            [self.task_model.id],
+            countdown=settings.TASK_UPDATE_NOTIFICATION_WINDOW
+        )
+        self.assertEqual(PendingTaskNotification.objects.get().updated_by, ['aa', 'bb'])
+
+    @patch('taskmanagerapp.services.outbox.enqueue')
+    def test_job_sends_one_mail_per_task(self, mock_job):
+        for day in range(24, 29):
+            self.edit(self.user, day)
+        send_coalesced_update_notifications([self.task_model.id])
+
+        self.assertFalse(PendingTaskNotification.objects.exists())
+        self.assertEqual(
+            sorted(QueuedEmail.objects.values_list('recipient', 'subject')),
+            [
+                ('testa@test.com', 'Status of Task Busy task has been updated by bb'),
+                ('testb@test.com', 'Task Busy task has been updated'),
+            ]
+        )
+
+        # The next edit opens a new window
+        mock_job.reset_mock()
+        self.edit(self.user, 29)
+        mock_job.assert_called_once()
+
+    def test_job_ignores_deleted_tasks(self):
+        self.edit(self.user, 24)
+        self.task_model.delete()
+        send_coalesced_update_notifications([self.task_model.id])
+        self.assertFalse(QueuedEmail.objects.exists())
+
+
+class NotificationRecipientsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.other_superuser = User.objects.create_superuser(
+            username='cc',
+            email='testc@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+
+    @patch('taskmanagerapp.tasks.mail.queue_mail')
+    def test_recipients_are_queried_once(self, mock_queue_mail):
+        self.assertEqual(sorted(recipients.superuser_emails()), ['testa@test.com', 'testc@test.com'])
+        with self.assertNumQueries(0):
+            notify_superusers_of_task_updated('Cached', 'bb')
+        self.assertEqual(sorted(mock_queue_mail.call_args.kwargs['recipient_list']), ['testa@test.com', 'testc@test.com'])
+
+    def test_user_changes_invalidate_recipients(self):
+        recipients.superuser_emails()
+        self.other_superuser.is_superuser = False
+        self.other_superuser.save()
+        self.assertEqual(recipients.superuser_emails(), ['testa@test.com'])
+
+        self.other_superuser.delete()
+        User.objects.create_superuser(username='dd', email='testd@test.com', password='12345678')
+        self.assertEqual(sorted(recipients.superuser_emails()), ['testa@test.com', 'testd@test.com'])
+
+    def test_logins_and_unrelated_changes_keep_the_cache(self):
+        recipients.superuser_emails()
+        self.client.login(username='aa', password='12345678')
+        self.user.first_name = 'Bea'
+        self.user.save()
+        with self.assertNumQueries(0):
+            recipients.superuser_emails()
+
+        self.superuser.email = 'new@test.com'
+        self.superuser.save()
+        self.assertEqual(sorted(recipients.superuser_emails()), ['new@test.com', 'testc@test.com'])
+
+    def test_subscriptions_filter_recipients(self):
+        recipients.superuser_emails()
+        NotificationSubscription.objects.create(user=self.other_superuser, assignee=self.user, priority='High')
+
+        self.assertEqual(sorted(recipients.superuser_emails(self.user.id, 'High')), ['testa@test.com', 'testc@test.com'])
+        self.assertEqual(recipients.superuser_emails(self.user.id, 'Low'), ['testa@test.com'])
+        self.assertEqual(recipients.superuser_emails(self.superuser.id, 'High'), ['testa@test.com'])
+
+        # Any of several subscriptions is enough
+        NotificationSubscription.objects.create(user=self.other_superuser, priority='Low')
+        self.assertEqual(sorted(recipients.superuser_emails(self.superuser.id, 'Low')), ['testa@test.com', 'testc@test.com'])
+
+
+class OutboxTest(TestCase):
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        self.task_data = {
+            'title': 'Outbox task',
+            'description': 'Outbox task',
+            'status': 'To Do',
+            'assignee': self.user.id,
+            'startDate': '2024-07-22T00:00:00Z',
+            'deadline': '2024-07-23T00:00:00Z',
+            'priority': 'Low'
+        }
+        # Published jobs run inline, without a broker
+        self.eager = celery_app.conf.task_always_eager, celery_app.conf.task_eager_propagates
+        celery_app.conf.task_always_eager = True
+        celery_app.conf.task_eager_propagates = True
+
+    def tearDown(self):
+        celery_app.conf.task_always_eager, celery_app.conf.task_eager_propagates = self.eager
+
+    def test_jobs_are_published_by_the_relay(self):
+        task, _ = services.create_task(self.superuser, self.task_data)
+        self.assertFalse(QueuedEmail.objects.exists())
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.dedup_key, f'task-created:{task.id}')
+
+        self.assertEqual(outbox.relay(), 1)
+        self.assertEqual(QueuedEmail.objects.get().subject, 'Task Outbox task has been created')
+        message.refresh_from_db()
+        self.assertIsNotNone(message.published_at)
+        self.assertEqual(outbox.relay(), 0)
+
+    def test_rolled_back_changes_send_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                services.create_task(self.superuser, self.task_data)
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_duplicate_dedup_keys_are_dropped(self):
+        outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once')
+        outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once')
+        with patch.object(send_task_email_to_assignee_updated, 'apply_async') as mock_publish:
+            outbox.relay()
+        mock_publish.assert_called_once_with(['testb@test.com', 'bb', 'Once'], {}, task_id='once')
+
+    def test_republished_jobs_run_once(self):
+        self.assertTrue(outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once'))
+        self.assertFalse(outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once'))
+        outbox.relay()
+        # A relay that died before marking the message published sends it again
+        OutboxMessage.objects.update(published_at=None)
+        outbox.relay()
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+    def test_duplicates_are_not_counted(self):
+        request_metrics, token = metrics.start_request()
+        try:
+            outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once')
+            outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Once', dedup_key='once')
+        finally:
+            metrics.current.reset(token)
+        self.assertEqual(request_metrics.counts['outbox_messages_total'], 1)
+
+    def test_purge_drops_old_bookkeeping(self):
+        outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Old', dedup_key='old')
+        outbox.relay()
+        outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'New')
+        old = timezone.now() - settings.OUTBOX_RETENTION - timedelta(minutes=1)
+        OutboxMessage.objects.filter(dedup_key='old').update(published_at=old)
+        ProcessedJob.objects.update(processed_at=old)
+
+        purge_outbox.apply()
+        self.assertEqual(OutboxMessage.objects.get().args[2], 'New')
+        self.assertFalse(ProcessedJob.objects.exists())
+
+    def test_delayed_jobs_wait_in_the_outbox(self):
+        outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', 'Later', countdown=60)
+        self.assertEqual(outbox.relay(), 0)
+        OutboxMessage.objects.update(available_at=timezone.now())
+        self.assertEqual(outbox.relay(), 1)
+
+    def test_relay_command_publishes_in_batches(self):
+        for i in range(5):
+            outbox.enqueue(send_task_email_to_assignee_updated, 'testb@test.com', 'bb', f'Task {i}')
+        out = StringIO()
+        call_command('relay_outbox', '--once', '--batch-size', '2', stdout=out)
+        self.assertIn('Published 5 messages', out.getvalue())
+        self.assertEqual(QueuedEmail.objects.count(), 5)
+
+
+class BenchmarkCommandTest(TestCase):
+
+    def test_benchmark_writes_json_and_keeps_no_data(self):
+        out = StringIO()
+        call_command(
+            'benchmark',
+            '--tasks', '20',
+            '--users', '2',
+            '--repeat', '1',
+            '--writes', '2',
+            '--notifications', '3',
+            stdout=out
+        )
+        results = json.loads(out.getvalue())
+
+        self.assertEqual(set(results), {'meta', 'list', 'serializer', 'create', 'patch', 'notifications'})
+        self.assertEqual(len(results['list']), len(services.SORT_FIELDS) * 2)
+        self.assertEqual(results['list']['deadline:asc']['warm_queries'], 0)
+        self.assertEqual(results['create']['requests'], 2)
+        # 3 enqueued jobs and the 2 created-task mails
+        self.assertEqual(results['notifications']['locmem_outbox'], 5)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_seeded_runs_do_not_collide(self):
+        with patch('taskmanagerapp.benchmarks.data.time.time', return_value=1700000000):
+            benchmark_data.seed(2, 1, label='loadtest')
+            benchmark_data.seed(2, 1, label='loadtest')
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(Task.objects.count(), 4)
+
+
+class RequestMetricsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.superuser = User.objects.create_superuser(
+            username='aa',
+            email='testa@test.com',
+            password='12345678'
+        )
+        self.user = User.objects.create_user(
+            username='bb',
+            email='testb@test.com',
+            password='12345678'
+        )
+        Task.objects.create(
+            title="Measured task",
+            description="Measured task",
+            assignee=self.user
+        )
+        self.token = str(RefreshToken.for_user(self.superuser).access_token)
+
+    def scrape(self):
+        self.client.login(username='aa', password='12345678')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_url_name(self):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        self.client.get('/api/tasks/', headers=headers)
+        self.client.get('/api/tasks/', headers=headers)
+        body = self.scrape()
+
+        self.assertIn('taskmanager_http_requests_total{view="task-list-api",method="GET",status="200"} 2', body)
+        self.assertIn('taskmanager_http_request_duration_seconds_count{view="task-list-api"} 2', body)
+        self.assertIn('taskmanager_http_request_duration_seconds_bucket{view="task-list-api",le="+Inf"} 2', body)
+        # The list is built once, the second request and user lookup hit the cache
+        self.assertIn('taskmanager_cache_misses_total{view="task-list-api"} 2', body)
+        self.assertIn('taskmanager_cache_hits_total{view="task-list-api"} 2', body)
+        self.assertIn('taskmanager_db_queries_total{view="task-list-api"}', body)
+
+    async def test_async_views_are_recorded(self):
+        response = await AsyncClient().get('/api/async/tasks/', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+        body = metrics.render(await sync_to_async(metrics.collect)())
+
+        self.assertIn('taskmanager_http_requests_total{view="async-task-list-api",method="GET",status="200"} 1', body)
+        self.assertIn('taskmanager_db_queries_total{view="async-task-list-api"}', body)
+
+    def test_outbox_writes_are_recorded(self):
+        self.client.force_login(self.superuser)
+        self.client.post('/api/tasks/', {
+            'title': 'Measured create',
+            'description': 'Measured create',
+            'status': 'To Do',
+            'assignee': self.user.id,
+            'startDate': '2024-07-22T00:00:00Z',
+            'deadline': '2024-07-23T00:00:00Z',
+            'priority': 'Low'
+        }, content_type='application/json')
+        self.assertIn('taskmanager_outbox_messages_total{view="task-list-api"} 1', self.scrape())
+
+    def test_metrics_require_a_superuser_or_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.login(username='bb', password='12345678')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer scrape-secret'})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'})
+            self.assertEqual(response.status_code, 403)
+
+    def test_totals_are_shared_between_processes(self):
+        self.client.get('/api/tasks/', headers={'Authorization': f'Bearer {self.token}'})
+        metrics.flush()
+        # Another worker process flushed the same totals
+        cache.set(metrics.process_key('other:1'), metrics.snapshot(), timeout=None)
+        cache.set(metrics.INDEX_KEY, cache.get(metrics.INDEX_KEY) | {'other:1'}, timeout=None)
+
+        self.assertIn('taskmanager_http_requests_total{view="task-list-api",method="GET",status="200"} 2', self.scrape())
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('taskmanagerapp.metrics', 'WARNING') as logs:
+            self.client.get('/api/tasks/', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertIn('Slow request GET /api/tasks/ (task-list-api)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class CeleryTaskMetricsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        for i in range(3):
+            QueuedEmail.objects.create(
+                subject=f'Queued {i}',
+                message='Queued',
+                from_email='Celery <violalaurastumpf@gmail.com>',
+                recipient='test@example.com'
+            )
+
+    def totals(self):
+        metrics.flush()
+        return metrics.collect(include_self=False)
+
+    def test_runs_and_smtp_time_are_recorded_per_task(self):
+        send_queued_emails_task.apply()
+        counters = self.totals()['counters']
+
+        labels = (('task', send_queued_emails_task.name),)
+        self.assertEqual(counters['celery_task_runs_total', labels + (('state', 'SUCCESS'),)], 1)
+        self.assertEqual(counters['celery_task_smtp_messages_total', labels], 3)
+        self.assertGreater(counters['celery_task_smtp_seconds_total', labels], 0)
+        self.assertGreater(counters['celery_task_db_queries_total', labels], 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failures_are_recorded_with_the_exception(self):
+        with patch('taskmanagerapp.tasks.mail.send_queued_emails', side_effect=RuntimeError):
+            send_queued_emails_task.apply()
+        counters = self.totals()['counters']
+
+        labels = (('task', send_queued_emails_task.name),)
+        self.assertEqual(counters['celery_task_runs_total', labels + (('state', 'FAILURE'),)], 1)
+        self.assertEqual(counters['celery_task_failures_total', labels + (('exception', 'RuntimeError'),)], 1)
+
+    def test_queue_wait_is_measured_from_publish(self):
+        headers = {}
+        metrics.mark_published(headers)
+        task = SimpleNamespace(
+            name='taskmanagerapp.tasks.send_queued_emails',
+            request=SimpleNamespace(is_eager=False, eta=None, published_at=headers['published_at'] - 2)
+        )
+        metrics.start_task('published-task', task)
+        metrics.finish_task('published-task', task, 'SUCCESS')
+
+        wait = self.totals()['histograms']['celery_task_queue_wait_seconds', (('task', task.name),)]
+        self.assertEqual(wait['count'], 1)
+        self.assertGreaterEqual(wait['sum'], 2)
+
+    def test_eta_tasks_held_are_counted_until_due(self):
+        metrics.receive_task('later', 'taskmanagerapp.tasks.send_queued_emails', (timezone.now() + timedelta(hours=1)).isoformat())
+        metrics.receive_task('due', 'taskmanagerapp.tasks.send_queued_emails', (timezone.now() - timedelta(seconds=1)).isoformat())
+        metrics.receive_task('now', 'taskmanagerapp.tasks.send_queued_emails', None)
+
+        gauges = self.totals()['gauges']
+        self.assertEqual(gauges['celery_eta_tasks_held', (('task', 'taskmanagerapp.tasks.send_queued_emails'),)], 1)
+
+    def test_summary_command(self):
+        send_queued_emails_task.apply()
+        metrics.flush()
+        out = StringIO()
+        call_command('celerymetrics', '--once', stdout=out)
+        row = next(line for line in out.getvalue().splitlines() if line.startswith('send_queued_emails'))
+        self.assertEqual(row.split()[1], '1')
+
+
+class ImportTasksCommandTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='importee', password='password', email='importee@example.com')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('importtasks', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_reports_invalid_rows_by_line(self):
+        path = self.write('tasks.csv', (
+            'title,description,assignee,status,startDate,deadline,priority\n'
+            'First,One,importee,Done,2030-01-01T09:00:00Z,2030-01-02T09:00:00Z,Low\n'
+            'Second,Two,nobody,,,,\n'
+            'Third,Three,importee,,2030-01-01T09:00:00+02:00,,\n'
+        ))
+        with CaptureQueriesContext(connection) as queries:
+            out, err = self.run_import(path, '--chunk-size', '1', '--notify', 'none')
+
+        self.assertIn('Imported 2 tasks, 1 invalid rows', out)
+        self.assertIn('Line 3:', err)
+        self.assertIn('Unknown user', err)
+        first = Task.objects.get(title='First')
+        self.assertEqual((first.assignee_id, first.status, first.priority), (self.user.pk, 'Done', 'Low'))
+        third = Task.objects.get(title='Third')
+        self.assertEqual(third.status, 'To Do')
+        self.assertEqual(third.startDate, datetime(2030, 1, 1, 7, tzinfo=pytz.UTC))
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(TaskStat.objects.get(status='Done', priority='Low').count, 1)
+        # Usernames are resolved once, not per row
+        self.assertEqual(sum('auth_user' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_ndjson_import_defers_notifications(self):
+        path = self.write('tasks.ndjson', '\n'.join([
+            json.dumps({'title': f'Task {i}', 'description': 'Imported', 'assignee_username': 'importee'})
+            for i in range(5)
+        ] + ['not json']))
+        out, err = self.run_import(path, '--chunk-size', '2')
+
+        self.assertIn('Imported 5 tasks, 1 invalid rows', out)
+        self.assertIn('Line 6:', err)
+        self.assertEqual(Task.objects.count(), 5)
+        messages = OutboxMessage.objects.order_by('id')
+        self.assertEqual([len(message.args[0]) for message in messages], [2, 2, 1])
+        self.assertEqual(
+            sorted(task_id for message in messages for task_id in message.args[0]),
+            sorted(Task.objects.values_list('id', flat=True))
+        )
+
+    def test_send_queues_notifications_per_chunk(self):
+        path = self.write('tasks.jsonl', '\n'.join(
+            json.dumps({'title': f'Task {i}', 'description': 'Imported', 'assignee': 'importee'}) for i in range(3)
+        ))
+        self.run_import(path, '--chunk-size', '2', '--notify', 'send')
+
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_dry_run_inserts_nothing(self):
+        path = self.write('tasks.csv', 'title,description,assignee\nFirst,One,importee\n')
+        out, _ = self.run_import(path, '--dry-run')
+
+        self.assertIn('Validated 1 tasks', out)
+        self.assertFalse(Task.objects.exists())
+
+    def test_unknown_format_requires_format_option(self):
+        path = self.write('tasks.txt', '')
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+
+
+class TaskExportTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(username='exporter', email='exporter@test.com', password='12345678')
+        self.user = User.objects.create_user(username='analyst', email='analyst@test.com', password='12345678')
+        for i in range(5):
+            Task.objects.create(
+                title=f'Task {i}, "quoted"',
+                description='Exported\nover two lines' if i == 0 else 'Exported',
+                status='Done' if i % 2 else 'To Do',
+                assignee=self.user if i % 2 else self.superuser,
+                startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+                deadline=datetime(2024, 7, 23 + i, 0, 0, 0, tzinfo=pytz.UTC),
+                priority='Low'
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+
+    def export(self, **params):
+        response = self.client.get('/api/tasks/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_formats_match_the_list_api(self):
+        full = self.client.get('/api/tasks/?sort=title&order=desc').json()
+
+        response, body = self.export(output='csv', sort='title', order='desc')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.csv"')
+        rows = list(csv.DictReader(StringIO(body.decode(), newline='')))
+        self.assertEqual(rows, [{name: str(value) for name, value in task.items()} for task in full])
+
+        _, body = self.export(output='ndjson', sort='title', order='desc')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], full)
+
+        _, body = self.export(output='columnar', sort='title', order='desc')
+        rows = list(export.read_columnar(io.BytesIO(body)))
+        self.assertEqual(len(rows), 5)
+        for row, task in zip(rows, full):
+            self.assertEqual(row['deadline'].strftime('%Y-%m-%dT%H:%M:%SZ'), task['deadline'])
+            row['startDate'] = row['deadline'] = None
+            task['startDate'] = task['deadline'] = None
+            self.assertEqual(row, task)
+
+    def test_columnar_blocks_per_chunk(self):
+        body = b''.join(export.iter_columnar(task_rows(services.order_tasks(Task.objects.all())), chunk_size=2))
+        rows = list(export.read_columnar(io.BytesIO(body)))
+        self.assertEqual([row['id'] for row in rows], list(Task.objects.order_by('deadline', 'id').values_list('id', flat=True)))
+        self.assertEqual({row['status'] for row in rows}, {'Done', 'To Do'})
+
+    def test_users_export_their_own_tasks(self):
+        self.client.force_authenticate(user=self.user)
+        _, body = self.export(output='ndjson')
+        self.assertEqual({json.loads(line)['assignee'] for line in body.splitlines()}, {self.user.id})
+
+    def test_users_cannot_export_other_assignees(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/export/', {'assignee': self.superuser.id, 'include_archived': 'true'})
+        self.assertEqual(response.status_code, 403)
+        _, body = self.export(output='ndjson', assignee=self.user.id)
+        self.assertEqual(len(body.splitlines()), 2)
+
+    async def test_asgi_export_streams_chunk_by_chunk(self):
+        produced = []
+
+        def writer(rows, chunk_size):
+            for i in range(3):
+                produced.append(i)
+                yield f'{i}\n'.encode()
+
+        token = str(RefreshToken.for_user(self.superuser).access_token)
+        with patch.dict(export.WRITERS, {'ndjson': writer}):
+            response = await AsyncClient().get(
+                '/api/tasks/export/',
+                {'output': 'ndjson'},
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b'0\n')
+            self.assertEqual(produced, [0])
+            self.assertEqual([chunk async for chunk in chunks], [b'1\n', b'2\n'])
+
+    def test_unknown_output(self):
+        response = self.client.get('/api/tasks/export/', {'output': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_csv_has_header(self):
+        Task.objects.all().delete()
+        _, body = self.export()
+        self.assertEqual(body.decode().strip(), ','.join(export.CSV_FIELDS))
+
+    def test_export_command(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'tasks.taskcol')
+        out = StringIO()
+        call_command('exporttasks', path, '--format', 'columnar', '--assignee', str(self.user.id), '--chunk-size', '1', stdout=out)
+
+        self.assertIn('Wrote', out.getvalue())
+        with open(path, 'rb') as f:
+            rows = list(export.read_columnar(f))
+        self.assertEqual([row['assignee_username'] for row in rows], ['analyst', 'analyst'])
+
+
+class TaskArchiveTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(username='archivist', email='archivist@test.com', password='12345678')
+        self.user = User.objects.create_user(username='worker', email='worker@test.com', password='12345678')
+        self.tasks = [
+            Task.objects.create(
+                title=f'Task {i}',
+                description='Archived' if i < 3 else 'Active',
+                status='Done' if i != 3 else 'In Progress',
+                assignee=self.user,
+                startDate=datetime(2024, 7, 22, 0, 0, 0, tzinfo=pytz.UTC),
+                deadline=datetime(2024, 7, 23 + i, 0, 0, 0, tzinfo=pytz.UTC),
+                priority='Low'
+            )
+            for i in range(5)
+        ]
+        # Tasks 0-3 are old, task 4 is done but recent
+        Task.objects.filter(pk__in=[task.pk for task in self.tasks[:4]]).update(
+            last_modified=timezone.now() - settings.TASK_ARCHIVE_AFTER - timedelta(days=1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_archive_moves_old_done_tasks_in_batches(self):
+        with patch('taskmanagerapp.archive.archive_batch', wraps=archive.archive_batch) as archive_batch:
+            self.assertEqual(archive.archive(batch_size=2), 3)
+        self.assertEqual(archive_batch.call_count, 2)
+
+        archived_ids = [task.pk for task in self.tasks[:3]]
+        self.assertEqual(sorted(ArchivedTask.objects.values_list('id', flat=True)), archived_ids)
+        self.assertFalse(Task.objects.filter(pk__in=archived_ids).exists())
+        self.assertEqual(Task.objects.count(), 2)
+        archived = ArchivedTask.objects.get(pk=self.tasks[0].pk)
+        self.assertEqual((archived.title, archived.assignee_id, archived.status), ('Task 0', self.user.id, 'Done'))
+        self.assertEqual(TaskStat.objects.get(assignee=self.user, status='Done', priority='Low').count, 1)
+
+    def test_batch_updates_stats_and_events_once(self):
+        with patch('taskmanagerapp.archive.events.publish_deleted') as publish_deleted, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as queries:
+            archive.archive()
+        stat_updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE') and 'taskstat' in query['sql']
+        ]
+        self.assertEqual(len(stat_updates), 1)
+        publish_deleted.assert_called_once()
+        self.assertEqual(len(publish_deleted.call_args.args[0]), 3)
+
+    def lock_error(self, pgcode):
+        # psycopg2 reports the SQLSTATE as pgcode on the wrapped error
+        cause = Exception('canceling statement due to lock timeout')
+        cause.pgcode = pgcode
+        error = OperationalError(*cause.args)
+        error.__cause__ = cause
+        return error
+
+    def test_lock_timeout_ends_the_run(self):
+        with patch('taskmanagerapp.archive.archive_batch', side_effect=[2, self.lock_error(archive.LOCK_NOT_AVAILABLE)]):
+            self.assertEqual(archive.archive(batch_size=2), 2)
+        with patch('taskmanagerapp.archive.archive_batch', side_effect=self.lock_error('40P01')):
+            with self.assertRaises(OperationalError):
+                archive.archive(batch_size=2)
+
+    def test_listings_include_archived_on_request(self):
+        self.assertEqual(len(self.client.get('/api/tasks/').json()), 5)
+        archive.archive()
+
+        # The cached listing is invalidated by the archiving
+        self.assertEqual([task['title'] for task in self.client.get('/api/tasks/').json()], ['Task 3', 'Task 4'])
+        response = self.client.get('/api/tasks/?include_archived=true&sort=deadline&order=desc')
+        self.assertEqual([task['title'] for task in response.json()], [f'Task {i}' for i in range(4, -1, -1)])
+        self.assertEqual(response.json()[-1]['assignee_username'], 'worker')
+
+    def test_paginated_listing_with_archived_tasks(self):
+        archive.archive()
+        titles = []
+        url = '/api/tasks/?include_archived=1&sort=title&page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            titles += [task['title'] for task in data['results']]
+            url = data['next']
+        self.assertEqual(titles, [f'Task {i}' for i in range(5)])
+
+    def test_export_with_archived_tasks(self):
+        archive.archive()
+        response = self.client.get('/api/tasks/export/', {'output': 'ndjson', 'include_archived': 'true'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['title'] for row in rows], [f'Task {i}' for i in range(5)])
+
+    def test_other_users_archived_tasks_stay_hidden(self):
+        archive.archive()
+        other = User.objects.create_user(username='other', email='other@test.com', password='12345678')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get('/api/tasks/?include_archived=true').json(), [])
+
+    def test_archive_task(self):
+        archive_done_tasks.apply()
+        self.assertEqual(ArchivedTask.objects.count(), 3)
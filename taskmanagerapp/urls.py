@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import TaskListApiView
+from .views import TaskListApiView, TaskBulkApiView, TaskCacheStatsApiView, TaskExportApiView, TaskStatsApiView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -19,6 +19,14 @@ urlpatterns = [
     path('updatetask/<int:task_id>/', views.task_update, name='task-update'),
     path('deletetask/<int:task_id>/', views.task_delete, name='task-delete'),
     path('api/tasks/', TaskListApiView.as_view(), name='task-list-api'),
+    path('api/tasks/bulk/', TaskBulkApiView.as_view(), name='task-bulk-api'),
+    path('api/tasks/export/', TaskExportApiView.as_view(), name='task-export-api'),
+    path('api/tasks/events/', views.task_events, name='task-events'),
+    path('api/tasks/cache-stats/', TaskCacheStatsApiView.as_view(), name='task-cache-stats-api'),
+    path('api/tasks/stats/', TaskStatsApiView.as_view(), name='task-stats-api'),
+    path('api/async/tasks/', views.async_task_list, name='async-task-list-api'),
+    path('api/async/tasks/<int:pk>/', views.async_task_detail, name='async-task-detail-api'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
 
     # Database APIs
     path('api/tasks/<int:pk>/', TaskListApiView.as_view(), name='task-detail-api'),
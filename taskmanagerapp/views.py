@@ -1,39 +1,40 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+import hashlib
+import json
+import logging
 import pytz
-import requests
-from dateutil.parser import isoparse
 
+from asgiref.sync import sync_to_async
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
 from django.utils.timezone import now, localtime
-from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.utils.urls import replace_query_param
 
+from . import cache as task_cache
+from . import authentication, events, export, metrics, pagination, services, stats
 from .forms import SignupForm, LoginForm
 from .models import Task
-from .tasks import send_task_email_to_assignee_created, send_task_email_to_assignee_updated, notify_superusers_of_task_updated, warn_users_one_day_before_deadline
 from .serializers import TaskSerializer
 
+logger = logging.getLogger(__name__)
 
-# Helper Functions
-def get_auth_headers(user):
-    refresh = RefreshToken.for_user(user)
-    access_token = str(refresh.access_token)
-    return {'Authorization': f'Bearer {access_token}'}
 
-
-def check_superuser(user):
-    if not user.is_superuser:
-        raise PermissionError('Permission denied.')
-
-    
+# Helper Functions
 def convert_to_utc_aware_datetime(date_str):
     try:
         # Parse the date string into a naive datetime object
@@ -54,55 +55,29 @@ def convert_to_utc_aware_datetime(date_str):
         raise ValueError("Invalid date format: Ensure it is ISO format.")
 
 
-def handle_api_response(response, success_redirect, error_template, request, data=None):
-    try:
-        response_data = response.json()
-    except ValueError:
-        response_data = {"error": "Failed to decode response as JSON."}
-        response_status = 500
-    else:
-        response_status = response.status_code
+def set_validators(response, etag, last_modified):
+    # Clients have to revalidate, which is cheap thanks to the validators
+    if response.status_code in [200, 304]:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    if response_status in [200, 201, 204]:
-        return redirect(success_redirect)
-    else:
-        print(f"Error: {response_status} - {response.text}")
-        if data:
-            print(f"Sent Data: {data}")
-        return render(request, error_template, {'error': response_data})
-
-
-def notify_assignee_email(task, start_date_aware, deadline_aware, is_update=False):
-    if is_update:
-        send_task_email_to_assignee_updated.delay(
-            task.assignee.email,
-            task.assignee.username,
-            task.title
-        )
-    else:
-        send_task_email_to_assignee_created.delay(
-            task.assignee.email,
-            task.assignee.username,
-            task.title,
-            start_date_aware,
-            deadline_aware
-        )
 
+def include_archived(request):
+    # ?include_archived=true adds archived tasks to listings and exports
+    return request.query_params.get('include_archived', '').lower() in ['1', 'true', 'yes']
 
-def schedule_warning_email(deadline_aware, assignee_email, assignee_username, task_title):
-    notify_time = deadline_aware - timedelta(days=1)
-    if notify_time > timezone.now():
-        warn_users_one_day_before_deadline.apply_async(
-            (
-                assignee_email,
-                assignee_username,
-                task_title,
-                deadline_aware
-            ),
-            eta=notify_time
-        )
-    else:
-        print("Deadline is too soon to schedule a warning email.")
+
+def is_asgi(request):
+    # DRF requests wrap the Django one
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def handle_service_error(error, error_template, request, data=None):
+    logger.warning('Task form error: %s (sent data: %s)', error, data)
+    return render(request, error_template, {'error': error})
 
 
 # Decorators
@@ -163,33 +138,17 @@ def admin_index(request):
 @login_required
 @admin_required
 def admin_tasklist(request):
-    # Generate JWT token for the user
-    headers = get_auth_headers(request.user)
     current_time = now()
 
-    response = requests.get(
-        f'{settings.BASE_URL}/api/tasks/',
-        headers=headers
+    tasks, _ = services.get_task_list_data(request.user)
+    for task in tasks:
+        task['assignee_name'] = task['assignee_username']
+    return render(
+        request,
+        'tasklist_admin.html',
+        {'tasks': tasks, 'current_time': current_time}
     )
 
-    if response.status_code == 200:
-        tasks = response.json()
-        for task in tasks:
-            assignee_id = task['assignee']
-            assignee = User.objects.get(id=assignee_id)
-            task['assignee_name'] = assignee.username
-        return render(
-            request,
-            'tasklist_admin.html',
-            {'tasks': tasks, 'current_time': current_time}
-        )
-    else:
-        return render(
-            request,
-            'tasklist.html',
-            {'error': 'Failed to retrieve tasks'}
-        )
-
 
 # Convert Task.Status choices to a list of dictionaries
 def get_status_choices():
@@ -205,28 +164,17 @@ def get_status_choices():
 def user_tasklist(request):
     assignee_id = request.GET.get('assignee', request.user.id)
 
-    headers = get_auth_headers(request.user)
-
-    response = requests.get(
-        f'{settings.BASE_URL}/api/tasks/?assignee={assignee_id}',
-        headers=headers
-    )
-
-    if response.status_code == 200:
-        tasks = response.json()
-        status_choices = get_status_choices()
-        current_time = now()
-        return render(request, 'tasklist.html', {
-            'tasks': tasks,
-            'status_choices': status_choices,
-            'current_time': current_time
-        })
-    else:
-        return render(
-            request,
-            'tasklist.html',
-            {'error': 'Failed to retrieve tasks'}
-        )
+    tasks, _ = services.get_task_list_data(request.user, assignee_id)
+    status_choices = get_status_choices()
+    current_time = now()
+    return render(request, 'tasklist.html', {
+        'tasks': tasks,
+        'status_choices': status_choices,
+        'current_time': current_time,
+        'assignee_id': assignee_id,
+        # The event stream needs the ASGI service, see task_events
+        'live_updates': settings.TASK_EVENTS_ENABLED and is_asgi(request)
+    })
 
 
 @login_required
@@ -258,19 +206,15 @@ def task_create(request):
             'priority': request.POST.get('priority')
         }
 
-        # Generate JWT token for the user
-        headers = get_auth_headers(request.user)
-        response = requests.post(
-            f'{settings.BASE_URL}/api/tasks/',
-            data=data,
-            headers=headers
-        )
-        return handle_api_response(
-            response,
-            'admin-tasklist',
-            'tasklist_create.html',
-            request, data
-        )
+        try:
+            services.create_task(request.user, data)
+        except ValidationError as e:
+            return handle_service_error(
+                e.detail,
+                'tasklist_create.html',
+                request, data
+            )
+        return redirect('admin-tasklist')
 
     else:
         users = User.objects.all()
@@ -290,7 +234,7 @@ def task_create(request):
 @login_required
 @admin_required
 def task_update(request, task_id):
-    current_task = get_object_or_404(Task, pk=task_id)
+    current_task = get_object_or_404(Task.objects.select_related('assignee'), pk=task_id)
     if request.method == 'POST':
         # Convert datetime strings to timezone-aware datetime objects
         start_date_str = request.POST.get('startDate')
@@ -309,25 +253,21 @@ def task_update(request, task_id):
         # Filter out any fields that are empty or not present
         data = {k: v for k, v in data.items() if v}
 
-        headers = get_auth_headers(request.user)
-
         if 'startDate' in data:
             data['startDate'] = convert_to_utc_aware_datetime(start_date_str)
 
         if 'deadline' in data:
             data['deadline'] = convert_to_utc_aware_datetime(end_date_str)
 
-        response = requests.patch(
-            f'{settings.BASE_URL}/api/tasks/{task_id}/',
-            json=data,
-            headers=headers
-        )
-        return handle_api_response(
-            response,
-            'admin-tasklist',
-            'tasklist_update.html',
-            request, data
-        )
+        try:
+            services.update_task(request.user, current_task, data)
+        except ValidationError as e:
+            return handle_service_error(
+                e.detail,
+                'tasklist_update.html',
+                request, data
+            )
+        return redirect('admin-tasklist')
 
     else:
         users = User.objects.all()
@@ -358,34 +298,149 @@ def task_update(request, task_id):
 @admin_required
 def task_delete(request, task_id):
     if request.method == 'POST':
+        services.delete_task(request.user, task_id)
+    return redirect('admin-tasklist')
 
-        headers = get_auth_headers(request.user)
 
-        response = requests.delete(
-            f'{settings.BASE_URL}/api/tasks/{task_id}/',
-            headers=headers
+# Live updates (server-sent events), served under ASGI
+async def task_events(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    assignee_id = request.GET.get('assignee')
+    if user.is_superuser:
+        scope = assignee_id or events.ALL_CHANNEL
+    elif assignee_id and assignee_id != str(user.id):
+        return HttpResponse(status=403)
+    else:
+        scope = user.id
+
+    # WSGI would read the endless stream into a list and hold a worker
+    # thread forever without responding
+    if not is_asgi(request):
+        return HttpResponse('Live updates are served by the ASGI service.', status=501)
+
+    response = StreamingHttpResponse(
+        events.stream_events(scope),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Prometheus scrape endpoint for the request metrics
+def prometheus_metrics(request):
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_superuser or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+# Async task API, served natively under ASGI. Reads use the async ORM and
+# share the list cache with TaskListApiView.
+async def aget_api_user(request, allow_session=True):
+    # JWT bearer tokens, or the session for safe methods. Session writes go
+    # through the CSRF-protected REST framework views instead.
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return await authentication.aauthenticate_bearer(header)
+
+    if allow_session:
+        user = await request.auser()
+        if user.is_authenticated:
+            return user
+    return None
+
+
+@csrf_exempt
+async def async_task_list(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Method not allowed.'}, status=405)
+
+    user = await aget_api_user(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    assignee_id = request.GET.get('assignee')
+    sort_by, order = services.normalize_sort(
+        request.GET.get('sort', 'deadline'),
+        request.GET.get('order', 'asc')
+    )
+
+    if 'cursor' not in request.GET and 'page_size' not in request.GET:
+        results, _ = await services.aget_task_list_data(user, assignee_id, sort_by, order)
+        return JsonResponse(results, safe=False)
+
+    try:
+        page_size = pagination.parse_page_size(
+            request.GET.get('page_size', pagination.DEFAULT_PAGE_SIZE)
+        )
+        results, next_cursor = await services.aget_task_list_data(
+            user,
+            assignee_id,
+            sort_by,
+            order,
+            request.GET.get('cursor'),
+            page_size
         )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
-        if response.status_code in [200, 204]:
-            return redirect('admin-tasklist')
-        else:
-            try:
-                error_message = response.json()
-            except ValueError:
-                error_message = {'error': 'Failed to delete task.'}
+    next_url = None
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+    return JsonResponse({'next': next_url, 'results': results})
 
-            return render(
-                request,
-                'tasklist_admin.html',
-                {'error': error_message}
-            )
-    else:
-        return redirect('admin-tasklist')
+
+@csrf_exempt
+async def async_task_detail(request, pk):
+    if request.method not in ['GET', 'PATCH']:
+        return JsonResponse({'detail': 'Method not allowed.'}, status=405)
+
+    user = await aget_api_user(request, allow_session=request.method == 'GET')
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    try:
+        task = await Task.objects.select_related('assignee').aget(pk=pk)
+    except Task.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    if not user.is_superuser and task.assignee_id != user.id:
+        return JsonResponse({'detail': 'Permission denied.'}, status=403)
+
+    if request.method == 'GET':
+        return JsonResponse(TaskSerializer(task).data)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Expected a JSON object.'}, status=400)
+
+    # Validation, the save and the pending notification need the sync ORM;
+    # the broker publish runs on commit in the same thread
+    try:
+        task, serializer = await sync_to_async(services.update_task)(user, task, data)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    response_data = serializer.data
+    if data.get('deadline'):
+        response_data['assignee_email'] = task.assignee.email
+    return JsonResponse(response_data)
 
 
 # REST framework viewset
 class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    queryset = Task.objects.select_related('assignee')
     serializer_class = TaskSerializer
 
 
@@ -394,74 +449,135 @@ class TaskListApiView(APIView):
 
     # Helper functions
     def get_task(self, pk):
-        return get_object_or_404(Task, pk=pk)
+        return get_object_or_404(Task.objects.select_related('assignee'), pk=pk)
+
+    def list_response(self, request, assignee_id, sort_by, order):
+        # Search results come ranked, best match first
+        if request.query_params.get('q'):
+            try:
+                page_size = pagination.parse_page_size(
+                    request.query_params.get('page_size', pagination.DEFAULT_PAGE_SIZE)
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            results = services.search_task_list_data(
+                request.user,
+                assignee_id,
+                request.query_params['q'],
+                page_size
+            )
+            return Response(results, status=status.HTTP_200_OK)
+
+        # Cursor pagination is opt-in, so the plain list stays the default
+        if 'cursor' in request.query_params or 'page_size' in request.query_params:
+            try:
+                page_size = pagination.parse_page_size(
+                    request.query_params.get('page_size', pagination.DEFAULT_PAGE_SIZE)
+                )
+                results, next_cursor = services.get_task_list_data(
+                    request.user,
+                    assignee_id,
+                    sort_by,
+                    order,
+                    request.query_params.get('cursor'),
+                    page_size,
+                    include_archived(request)
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            next_url = None
+            if next_cursor:
+                next_url = replace_query_param(
+                    request.build_absolute_uri(),
+                    'cursor',
+                    next_cursor
+                )
+            return Response(
+                {'next': next_url, 'results': results},
+                status=status.HTTP_200_OK
+            )
+
+        results, _ = services.get_task_list_data(
+            request.user,
+            assignee_id,
+            sort_by,
+            order,
+            include_archived=include_archived(request)
+        )
+        return Response(results, status=status.HTTP_200_OK)
+
+    # Retrieve a single task
+    def retrieve(self, request, pk):
+        version = Task.objects.filter(pk=pk).values('assignee_id', 'last_modified').first()
+        if version is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not request.user.is_superuser and version['assignee_id'] != request.user.id:
+            return Response(
+                {'detail': 'Permission denied.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        last_modified = version['last_modified'].timestamp()
+        etag = quote_etag(f'task-{pk}-{last_modified}')
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+        if response is None:
+            serializer = TaskSerializer(self.get_task(pk))
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(response, etag, last_modified)
 
     # List all todos
     def get(self, request, *args, **kwargs):
+        if kwargs.get('pk') is not None:
+            return self.retrieve(request, kwargs.get('pk'))
 
         assignee_id = request.query_params.get('assignee', None)
         sort_by = request.query_params.get('sort', 'deadline')  # Default sorting by deadline
         order = request.query_params.get('order', 'asc')  # Default order ascending
 
-        if request.user.is_superuser and not assignee_id:
-            tasks = Task.objects.all()
-        else:
-            if assignee_id:
-                tasks = Task.objects.filter(assignee=assignee_id)
-            else:
-                tasks = Task.objects.filter(assignee=request.user.id)
-
-        if sort_by in [
-            'title',
-            'assignee',
-            'status',
-            'startDate',
-            'deadline',
-            'priority']:
-            if order == 'desc':
-                tasks = tasks.order_by(f'-{sort_by}')
-            else:
-                tasks = tasks.order_by(sort_by)
-        else:
-            tasks = tasks.order_by('deadline')
+        sort_by, order = services.normalize_sort(sort_by, order)
 
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Full export as newline-delimited JSON
+        if request.query_params.get('stream') == 'ndjson':
+            rows = services.list_task_rows(request.user, assignee_id, sort_by, order, include_archived(request))
+            return export.stream_export(rows, 'ndjson', attachment=False, asynchronous=is_asgi(request))
+
+        # Revalidations are answered from the change version of the listing,
+        # before the task query or the serializer runs
+        scope = services.get_list_scope(request.user, assignee_id)
+        generation, last_modified = services.get_list_version(request.user, assignee_id)
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        etag = quote_etag(f'tasks-{scope}-{generation}-{path_hash}')
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified) if last_modified is not None else None
+        )
+        if response is None:
+            response = self.list_response(request, assignee_id, sort_by, order)
+        return set_validators(response, etag, last_modified)
 
     # Create a Todo
     def post(self, request, *args, **kwargs):
         try:
-            check_superuser(request.user)
-
             if request.content_type == 'application/json':
                 data = request.data
             else:
                 data = request.POST
-            serializer = TaskSerializer(data=data)
 
-            if serializer.is_valid():
-                task = serializer.save()
-                response_data = serializer.data
-
-                response_data['assignee_email'] = task.assignee.email
+            task, serializer = services.create_task(request.user, data)
+            response_data = serializer.data
 
-                notify_assignee_email(
-                    task,
-                    task.startDate,
-                    task.deadline
-                )
-                schedule_warning_email(
-                    task.deadline,
-                    task.assignee.email,
-                    task.assignee.username,
-                    task.title
-                )
+            response_data['assignee_email'] = task.assignee.email
 
-                return Response(response_data, status=status.HTTP_201_CREATED)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_201_CREATED)
         except PermissionError as e:
             return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -469,37 +585,17 @@ class TaskListApiView(APIView):
 
     def put(self, request, *args, **kwargs):
         try:
-            # check_superuser(request.user)
             task = self.get_task(kwargs.get('pk'))
-            serializer = TaskSerializer(task, data=request.data, partial=False)
-
-            if serializer.is_valid():
-                serializer.save()
-                response_data = serializer.data
-
-                start_date_str = request.data['startDate']
-                deadline_str = request.data['deadline']
+            task, serializer = services.replace_task(request.user, task, request.data)
+            response_data = serializer.data
 
-                response_data['assignee_email'] = task.assignee.email
+            response_data['assignee_email'] = task.assignee.email
 
-                notify_assignee_email(
-                    task,
-                    start_date_str,
-                    deadline_str,
-                    is_update=True
-                )
-                schedule_warning_email(
-                    isoparse(deadline_str),
-                    task.assignee.email,
-                    task.assignee.username,
-                    task.title
-                )
-
-                return Response(response_data, status=status.HTTP_200_OK)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data, status=status.HTTP_200_OK)
         except PermissionError as e:
             return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -507,55 +603,131 @@ class TaskListApiView(APIView):
     def patch(self, request, *args, **kwargs):
         task = self.get_task(kwargs.get('pk'))
 
-        if not request.user.is_superuser and task.assignee != request.user:
+        try:
+            task, serializer = services.update_task(request.user, task, request.data)
+        except PermissionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data = serializer.data
+        if request.data.get('deadline'):
+            response_data['assignee_email'] = task.assignee.email
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        try:
+            services.delete_task(request.user, kwargs.get('pk'))
+        except PermissionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TaskExportApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Streams the listing of TaskListApiView (same assignee, sort, order and
+    # include_archived parameters) as CSV, NDJSON or the columnar format, see export.py.
+    # ?format= is taken by DRF's format suffixes, hence ?output=.
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in export.FORMATS:
+            return Response(
+                {'error': f"output must be one of {', '.join(export.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        assignee_id = request.query_params.get('assignee', None)
+        if not request.user.is_superuser and assignee_id and assignee_id != str(request.user.id):
             return Response(
                 {'detail': 'Permission denied.'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer = TaskSerializer(task, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            response_data = serializer.data
-
-            deadline_str = request.data.get('deadline')
-            if deadline_str:
-                try:
-                    response_data['assignee_email'] = task.assignee.email
-
-                    send_task_email_to_assignee_updated.delay(
-                        task.assignee.email,
-                        task.assignee.username,
-                        task.title
-                    )
-                    notify_superusers_of_task_updated.delay(
-                        task.title,
-                        request.user.username
-                    )
-                    schedule_warning_email(
-                        isoparse(deadline_str),
-                        task.assignee.email,
-                        task.assignee.username,
-                        task.title
-                    )
-
-                except ValueError:
-                    return Response(
-                        {'error': 'Invalid date format'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+        rows = services.list_task_rows(
+            request.user,
+            assignee_id,
+            request.query_params.get('sort', 'deadline'),
+            request.query_params.get('order', 'asc'),
+            include_archived(request)
+        )
+        return export.stream_export(rows, export_format, asynchronous=is_asgi(request))
 
-            return Response(response_data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def delete(self, request, *args, **kwargs):
+class TaskCacheStatsApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
+    # Hit/miss counters of the task list cache
+    def get(self, request, *args, **kwargs):
         if not request.user.is_superuser:
             return Response(
                 {'detail': 'Permission denied.'},
                 status=status.HTTP_403_FORBIDDEN
             )
+        return Response(task_cache.get_stats(), status=status.HTTP_200_OK)
 
-        task = self.get_task(kwargs.get('pk'))
-        task.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class TaskStatsApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Task counts from the summary tables, never from the tasks table
+    def get(self, request, *args, **kwargs):
+        assignee_id = request.query_params.get('assignee', None)
+        if not request.user.is_superuser:
+            if assignee_id and assignee_id != str(request.user.id):
+                return Response(
+                    {'detail': 'Permission denied.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            assignee_id = request.user.id
+        return Response(stats.get_stats(assignee_id), status=status.HTTP_200_OK)
+
+
+class TaskBulkApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Helper functions
+    def get_items(self, request):
+        if not isinstance(request.data, list):
+            raise ValueError('Expected a list of items.')
+        return request.data
+
+    def bulk_response(self, results, errors, success_status):
+        response_status = success_status if results or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({'results': results, 'errors': errors}, status=response_status)
+
+    # Create many tasks
+    def post(self, request, *args, **kwargs):
+        try:
+            tasks, errors = services.bulk_create_tasks(request.user, self.get_items(request))
+        except PermissionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TaskSerializer(tasks, many=True)
+        return self.bulk_response(serializer.data, errors, status.HTTP_201_CREATED)
+
+    # Partially update many tasks, each item carries its id
+    def patch(self, request, *args, **kwargs):
+        try:
+            tasks, errors = services.bulk_update_tasks(request.user, self.get_items(request))
+        except PermissionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TaskSerializer(tasks, many=True)
+        return self.bulk_response(serializer.data, errors, status.HTTP_200_OK)
+
+    # Delete many tasks by id
+    def delete(self, request, *args, **kwargs):
+        try:
+            deleted_ids, errors = services.bulk_delete_tasks(request.user, self.get_items(request))
+        except PermissionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return self.bulk_response(sorted(deleted_ids), errors, status.HTTP_200_OK)